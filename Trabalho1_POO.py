@@ -1,32 +1,265 @@
+import heapq
+import math
+import os
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
-entrada = open(sys.argv[1], encoding='utf-8')
-saida = open(sys.argv[1] + '.ana', 'w', encoding='utf-8')
-
-#dicionário em que os anagramas serão armazenados.
-#palavras que são anagramas terão o mesmo valor retornado pela função sorted().
-#esses sorted() serão as chaves e os valores associados serão listas com todos os anagramas.
-conjunto_anagrama = {}
-
-for palavra in entrada.readlines():
-	#é necessário a conversão str() porque a função sorted() retorna uma lista.
-	s = str(sorted(palavra.strip().lower()))
-	#verifica se já existe anagramas da str palavra no dicionário.
-	if s in conjunto_anagrama.keys():
-		conjunto_anagrama[s].append(palavra.strip().lower())
-	#caso contrário, cria-se uma nova chave associada a essa palavra.
-	else:
-		conjunto_anagrama[s] = []
-		conjunto_anagrama[s].append(palavra.strip().lower())
+def chave(palavra):
+	'''Retorna a chave canônica de uma palavra: suas letras em ordem.
+	Palavras que são anagramas têm a mesma chave.'''
+	return ''.join(sorted(palavra))
+
+def agrupa(linhas, conjunto_anagrama=None):
+	'''Acrescenta as palavras (uma por linha) ao dicionário de anagramas e o retorna.
+	As chaves aparecem no dicionário na ordem da primeira palavra de cada grupo.'''
+	if conjunto_anagrama is None:
+		conjunto_anagrama = {}
+	for linha in linhas:
+		palavra = linha.strip().lower()
+		s = chave(palavra)
+		grupo = conjunto_anagrama.get(s)
+		#caso não exista anagramas dessa palavra, cria-se uma nova chave associada a ela.
+		if grupo is None:
+			conjunto_anagrama[s] = [palavra]
+		else:
+			grupo.append(palavra)
+	return conjunto_anagrama
+
+def escreve(conjunto_anagrama, saida, bloco=65536):
+	'''Escreve os grupos de anagramas, cada um em ordem alfanumérica, em uma linha do arquivo saida.
+	As linhas são acumuladas e escritas em blocos.'''
+	linhas = []
+	for grupo in conjunto_anagrama.values():
+		grupo.sort()
+		linhas.append(', '.join(grupo) + '\n')
+		if len(linhas) >= bloco:
+			saida.write(''.join(linhas))
+			linhas = []
+	saida.write(''.join(linhas))
+
+def divide(nome, partes):
+	'''Divide o arquivo em até partes intervalos de bytes (início, fim), com os cortes logo após uma quebra de linha.'''
+	tamanho = os.path.getsize(nome)
+	cortes = [0]
+	with open(nome, 'rb') as arquivo:
+		for i in range(1, partes):
+			posicao = max(tamanho*i//partes, cortes[-1])
+			if posicao > 0:
+				#avança até o fim da linha em que o corte caiu.
+				arquivo.seek(posicao - 1)
+				arquivo.readline()
+			cortes.append(min(arquivo.tell(), tamanho))
+	cortes.append(tamanho)
+	return [(inicio, fim) for inicio, fim in zip(cortes, cortes[1:]) if fim > inicio]
+
+def linhas_do_intervalo(nome, inicio, fim):
+	'''Gera as linhas do arquivo entre os bytes inicio e fim, separadas como na leitura em modo texto (\\n, \\r\\n ou \\r).'''
+	with open(nome, 'rb') as arquivo:
+		arquivo.seek(inicio)
+		restante = fim - inicio
+		for bruta in arquivo:
+			if restante <= 0:
+				break
+			restante -= len(bruta)
+			linha = bruta.decode('utf-8')
+			if '\r' in linha:
+				partes = linha.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+				if partes[-1] == '':
+					partes.pop()
+				yield from partes
+			else:
+				yield linha
+
+def agrupa_intervalo(nome, inicio, fim):
+	'''Agrupa os anagramas de um intervalo de bytes do arquivo (executado em um processo à parte).'''
+	return agrupa(linhas_do_intervalo(nome, inicio, fim))
+
+def agrupa_paralelo(nome, processos):
+	'''Agrupa os anagramas do arquivo dividindo-o em intervalos processados em paralelo.
+	Os dicionários parciais são combinados na ordem dos intervalos, então o resultado é igual ao da versão serial.'''
+	intervalos = divide(nome, 4*processos)
+	conjunto_anagrama = {}
+	with ProcessPoolExecutor(max_workers=processos) as executor:
+		parciais = executor.map(agrupa_intervalo, [nome]*len(intervalos), *zip(*intervalos))
+		for parcial in parciais:
+			for s, palavras in parcial.items():
+				grupo = conjunto_anagrama.get(s)
+				if grupo is None:
+					conjunto_anagrama[s] = palavras
+				else:
+					grupo.extend(palavras)
+	return conjunto_anagrama
+
+#Estimativa de quantos bytes de memória cada byte da entrada ocupa ao ser agrupado (objetos str, listas e dicionário),
+#medida em listas de palavras; usada só para escolher o número inicial de partições.
+FATOR_MEMORIA = 28
+
+#Estimativa da memória usada para agrupar uma partição já gravada: bytes por registro (objetos de cada palavra)
+#mais bytes por byte gravado. Cada partição é verificada com a contagem real de seus registros antes de ser agrupada.
+MEMORIA_POR_REGISTRO = 200
+MEMORIA_POR_BYTE = 4
+
+#Limite de arquivos temporários abertos ao mesmo tempo.
+MAX_PARTICOES = 512
+
+#Limite de redivisões de uma partição; só é atingido se um único grupo de anagramas não couber na memória.
+MAX_NIVEIS = 8
+
+def memoria_da_particao(registros, tamanho):
+	'''Estima a memória usada para agrupar uma partição com o número de registros e bytes dados.'''
+	return MEMORIA_POR_REGISTRO*registros + MEMORIA_POR_BYTE*tamanho
 
+def espalha(registros, diretorio, particoes, nivel, memoria):
+	'''Grava os registros (posição, palavra) em particoes arquivos temporários no diretório, escolhidos pelo hash da chave
+	da palavra combinado com o nível (para que uma redivisão separe chaves que caíram juntas no nível anterior).
+	Retorna a lista de (nome, número de registros, bytes) de cada partição.'''
+	#buffer de escrita de cada arquivo temporário, dividindo parte da memória entre as partições.
+	buffer = max(8192, memoria//(4*particoes))
+	nomes = []
+	for i in range(particoes):
+		arquivo, nome = tempfile.mkstemp(dir=diretorio)
+		os.close(arquivo)
+		nomes.append(nome)
+	contagens = [0]*particoes
+	tamanhos = [0]*particoes
+	arquivos = [open(nome, 'w', encoding='utf-8', newline='\n', buffering=buffer) for nome in nomes]
+	try:
+		for posicao, palavra in registros:
+			s = chave(palavra)
+			i = hash(s if nivel == 0 else '%d %s' % (nivel, s)) % particoes
+			registro = '%d %s\n' % (posicao, palavra)
+			arquivos[i].write(registro)
+			contagens[i] += 1
+			tamanhos[i] += len(registro.encode('utf-8'))
+	finally:
+		for arquivo in arquivos:
+			arquivo.close()
+	return list(zip(nomes, contagens, tamanhos))
+
+def registros_do_arquivo(nome):
+	'''Gera os registros (posição, palavra) gravados em um arquivo temporário.'''
+	with open(nome, encoding='utf-8', newline='\n') as arquivo:
+		for registro in arquivo:
+			posicao, palavra = registro[:-1].split(' ', 1)
+			yield int(posicao), palavra
+
+def agrupa_particao(nome):
+	'''Agrupa os registros de uma partição e regrava o arquivo com seus grupos ordenados pela posição da primeira palavra.'''
+	grupos = {}
+	for posicao, palavra in registros_do_arquivo(nome):
+		s = chave(palavra)
+		grupo = grupos.get(s)
+		if grupo is None:
+			grupos[s] = [posicao, palavra]
+		else:
+			grupo.append(palavra)
+	with open(nome, 'w', encoding='utf-8', newline='\n') as arquivo:
+		for grupo in grupos.values():
+			palavras = grupo[1:]
+			palavras.sort()
+			arquivo.write('%d %s\n' % (grupo[0], ', '.join(palavras)))
+
+def agrupa_particoes(particoes, diretorio, memoria, nivel=0):
+	'''Agrupa as partições (nome, registros, bytes) que cabem em memoria bytes; as outras são redivididas recursivamente.
+	Retorna os nomes dos arquivos de grupos, cada um ordenado pela posição da primeira palavra dos grupos.'''
+	nomes = []
+	for nome, registros, tamanho in particoes:
+		necessaria = memoria_da_particao(registros, tamanho)
+		if necessaria <= memoria:
+			agrupa_particao(nome)
+			nomes.append(nome)
+			continue
+		if nivel >= MAX_NIVEIS:
+			raise MemoryError('Uma partição de %d palavras não cabe em %d bytes de memória mesmo após %d redivisões '
+							  '(há um grupo de anagramas grande demais).' % (registros, memoria, MAX_NIVEIS))
+		partes = min(MAX_PARTICOES, max(2, math.ceil(necessaria/memoria)))
+		subparticoes = espalha(registros_do_arquivo(nome), diretorio, partes, nivel + 1, memoria)
+		os.remove(nome)
+		nomes.extend(agrupa_particoes(subparticoes, diretorio, memoria, nivel + 1))
+	return nomes
+
+def intercala(nomes, saida, diretorio):
+	'''Intercala os grupos dos arquivos pela posição da primeira palavra e escreve-os em saida, sem as posições.
+	Se houver mais de MAX_PARTICOES arquivos, eles são antes intercalados em lotes, em arquivos intermediários.'''
+	while len(nomes) > MAX_PARTICOES:
+		lotes = [nomes[i:i + MAX_PARTICOES] for i in range(0, len(nomes), MAX_PARTICOES)]
+		nomes = []
+		for lote in lotes:
+			arquivo, nome = tempfile.mkstemp(dir=diretorio)
+			with open(arquivo, 'w', encoding='utf-8', newline='\n') as intermediario:
+				intercala_lote(lote, intermediario, True)
+			for antigo in lote:
+				os.remove(antigo)
+			nomes.append(nome)
+	intercala_lote(nomes, saida, False)
+
+def intercala_lote(nomes, saida, posicoes):
+	'''Intercala os grupos dos arquivos pela posição da primeira palavra, mantendo as posições nas linhas se posicoes for True.'''
+	arquivos = [open(nome, encoding='utf-8', newline='\n') for nome in nomes]
+	try:
+		registros = [((int(registro.split(' ', 1)[0]), registro) for registro in arquivo) for arquivo in arquivos]
+		linhas_saida = []
+		for posicao, registro in heapq.merge(*registros):
+			linhas_saida.append(registro if posicoes else registro.split(' ', 1)[1])
+			if len(linhas_saida) >= 65536:
+				saida.write(''.join(linhas_saida))
+				linhas_saida = []
+		saida.write(''.join(linhas_saida))
+	finally:
+		for arquivo in arquivos:
+			arquivo.close()
+
+def agrupa_externo(linhas, saida, memoria, tamanho, diretorio=None):
+	'''Agrupa os anagramas sem guardar todas as palavras na memória e escreve o resultado em saida.
+	As palavras são distribuídas, pelo hash de sua chave, em partições gravadas em arquivos temporários no diretório dado,
+	em quantidade estimada a partir do tamanho da entrada (em bytes) para que cada partição caiba em memoria bytes.
+	Antes de ser agrupada, cada partição é verificada com seu número real de registros e, se não couber, é redividida.
+	Os grupos de todas as partições são intercalados na ordem da primeira palavra de cada grupo,
+	então o resultado é igual ao da versão em memória.'''
+	particoes = min(MAX_PARTICOES, max(1, math.ceil(FATOR_MEMORIA*tamanho/memoria)))
+	with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+		#Primeira passada: cada palavra vai para o arquivo de sua partição, junto com sua posição na entrada.
+		registros = ((posicao, linha.strip().lower()) for posicao, linha in enumerate(linhas))
+		primeiras = espalha(registros, temporario, particoes, 0, memoria)
+
+		#Segunda passada: agrupa cada partição (redividindo as grandes demais) e grava seus grupos ordenados pela posição.
+		nomes = agrupa_particoes(primeiras, temporario, memoria)
+
+		#Intercala os grupos de todas as partições pela posição da primeira palavra.
+		intercala(nomes, saida, temporario)
+
+if __name__ == '__main__':
+	#uso: python Trabalho1_POO.py arquivo [--processos N] [--memoria MB] [--temporario DIRETORIO] [--indice]
+	#com --indice, grava também o índice binário arquivo.idx (veja indice_anagramas.py); não disponível com --memoria.
+	processos = 1
+	if '--processos' in sys.argv:
+		processos = int(sys.argv[sys.argv.index('--processos') + 1])
+	memoria = None
+	if '--memoria' in sys.argv:
+		memoria = int(float(sys.argv[sys.argv.index('--memoria') + 1])*2**20)
+	temporario = None
+	if '--temporario' in sys.argv:
+		temporario = sys.argv[sys.argv.index('--temporario') + 1]
+
+	if memoria is not None:
+		#modo externo: os anagramas são agrupados em partições gravadas em disco, respeitando o limite de memória.
+		with open(sys.argv[1], encoding='utf-8') as entrada, open(sys.argv[1] + '.ana', 'w', encoding='utf-8') as saida:
+			agrupa_externo(entrada, saida, memoria, os.path.getsize(sys.argv[1]), temporario)
+		sys.exit()
+
+	#dicionário em que os anagramas serão armazenados.
+	#palavras que são anagramas terão a mesma chave (suas letras em ordem).
+	#os valores associados às chaves são listas com todos os anagramas.
+	if processos > 1:
+		conjunto_anagrama = agrupa_paralelo(sys.argv[1], processos)
+	else:
+		with open(sys.argv[1], encoding='utf-8') as entrada:
+			conjunto_anagrama = agrupa(entrada)
 
-for chave in conjunto_anagrama.keys():
-	#organiza os conjuntos de anagramas em ordem alfanumérica.
-	linha = sorted(conjunto_anagrama[chave])
-	saida.write(linha[0])
-	for k in range(1, len(linha)):
-		saida.write(', ' + linha[k])
-	saida.write('\n')
+	with open(sys.argv[1] + '.ana', 'w', encoding='utf-8') as saida:
+		escreve(conjunto_anagrama, saida)
 
-entrada.close()
-saida.close()
+	if '--indice' in sys.argv:
+		from indice_anagramas import grava_indice
+		grava_indice(conjunto_anagrama, sys.argv[1] + '.idx')
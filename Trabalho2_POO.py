@@ -1,5 +1,17 @@
-from quaternion.quaternion import Quaternion 
+try:
+	from quaternion.quaternion import Quaternion
+except ImportError:
+	#Permite importar o módulo quando quaternion.py está no mesmo diretório.
+	from quaternion import Quaternion
+import argparse
 import math
+import sys
+
+try:
+	import numpy as np
+except ImportError:
+	#O NumPy só é necessário para rotacionar nuvens de pontos (rotate_points).
+	np = None
 
 class Cube:
 	'''Classe para representar o cubo, com um método que rotaciona seus vértices e um método para visualizar esses vértices.'''
@@ -15,19 +27,17 @@ class Cube:
 		'''Rotaciona os vértices com a fórmula rpr^-1, dada no roteiro, como um produto quaterniônico.'''
 	
 		#Define r como um quaternion.
-		r = Quaternion(math.cos(angle/2), math.sin(angle/2)/math.sqrt(axis[0]**2 + axis[1]**2 + axis[2]**2)*axis[0], math.sin(angle/2)/math.sqrt(axis[0]**2 + axis[1]**2 + axis[2]**2)*axis[1], math.sin(angle/2)/math.sqrt(axis[0]**2 + axis[1]**2 + axis[2]**2)*axis[2])
+		r = axis_angle_quaternion(axis, angle)
+		
+		#O inverso de r é o mesmo para todos os vértices, então é calculado uma única vez.
+		r_inverse = r.inverse()
 		
 		#Aplica o mesmo processo para cada um dos 8 vértices.
 		for i in range(len(self._vertices)):
 			p = Quaternion(0, self._vertices[i][0], self._vertices[i][1], self._vertices[i][2]) 
-			intermediate = r*p
 			
-			#r*p retorna uma tupla, então é necessário inicializar um novo quaternion new_rp com os valores de r*p.
-			new_rp = Quaternion(intermediate[0], intermediate[1], intermediate[2], intermediate[3])
-			
-			#Da mesma forma, r.inverse() retorna uma tupla, então r_inverse é inicializado como quaternion para ser o termo r^-1. 
-			r_inverse = Quaternion(r.inverse()[0], r.inverse()[1], r.inverse()[2], r.inverse()[3])
-			p_rot = new_rp*r_inverse
+			#As operações entre quaternions retornam quaternions, então o produto pode ser feito diretamente.
+			p_rot = r*p*r_inverse
 			
 			#Como citado no roteiro, o termo a0 de a0 + a1*i + a2*j + a3*k não interessa para encontrar as novas coordenadas do vértice.
 			coord = [p_rot[1], p_rot[2], p_rot[3]]
@@ -48,17 +58,121 @@ class Cube:
 		'''Retorna as novas coordenadas dos vértices.'''
 		return self._newvertices
 
-#Cria-se um objeto com as coordenadas originais do cubo.		
-solid = Cube([(1, 1, 1), (1, 1, -1), (1, -1, 1), (-1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1), (-1, -1, -1)])
-
-#A ausência de condição de parada se deve à possibilidade do usuário fazer quantas rotações quiser.
-while True:
-	line = input('Digite as coordenadas do ponto que, junto com a origem, definem um eixo (separadas por espaço): ').split()
-	for i in range(len(line)):
-		line[i] = float(line[i])
-	alpha = float(input('Digite um ângulo de rotação, em graus: '))
-	solid.rotation(line, math.pi*alpha/180)
-	print(solid.get_vertices())
+def axis_angle_quaternion(axis, angle):
+	'''Retorna o quaternion unitário r que representa a rotação de um ângulo (em radianos) em torno do eixo dado.'''
+	s = math.sin(angle/2)/math.sqrt(axis[0]**2 + axis[1]**2 + axis[2]**2)
+	return Quaternion(math.cos(angle/2), s*axis[0], s*axis[1], s*axis[2])
+
+def rotation_matrix(r):
+	'''Converte o quaternion unitário r na matriz 3x3 da rotação p -> rpr^-1.'''
+	w, x, y, z = r
+	return np.array([[1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)],
+					 [2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)],
+					 [2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y)]])
+
+def round_points(points, decimals=6):
+	'''Arredonda as coordenadas no próprio array, como em Cube.rotation (o -0.0 vira 0.0).'''
+	np.round(points, decimals, out=points)
+	points += 0.0
+	return points
+
+#Quantidade de pontos rotacionados por vez, para limitar a memória temporária.
+BLOCK = 65536
+
+def rotate_points(points, axis, angle, out=None, decimals=None):
+	'''Rotaciona uma nuvem de pontos (array de formato (N, 3)) em torno do eixo dado.
+	O quaternion da rotação é convertido uma única vez em matriz, aplicada a todos os pontos de forma vetorizada.
+	O resultado é escrito em out (que pode ser o próprio points, para rotacionar no lugar) ou em um novo array.
+	Se decimals for dado, as coordenadas são arredondadas ao final.'''
+	return rotate_points_by(points, axis_angle_quaternion(axis, angle), out, decimals)
+
+def rotate_points_by(points, r, out=None, decimals=None):
+	'''Rotaciona uma nuvem de pontos pelo quaternion unitário r, como rotate_points.'''
+	if np is None:
+		raise ImportError('A rotação de nuvens de pontos precisa do NumPy.')
+	points = np.asarray(points, dtype=float)
+	if points.ndim != 2 or points.shape[1] != 3:
+		raise ValueError('Os pontos devem formar um array de formato (N, 3).')
+	if out is None:
+		out = np.empty_like(points)
+	elif out.shape != points.shape:
+		raise ValueError('O array de saída deve ter o mesmo formato dos pontos.')
+	matrix = rotation_matrix(r).T
+	for start in range(0, len(points), BLOCK):
+		block = points[start:start + BLOCK]
+		out[start:start + BLOCK] = block @ matrix
+	if decimals is not None:
+		round_points(out, decimals)
+	return out
+
+def read_commands(stream):
+	'''Lê comandos de rotação "x y z ângulo" (eixo e ângulo em graus), um por linha.
+	Linhas vazias e o que vem depois de # são ignorados. Retorna um gerador de pares (eixo, ângulo em radianos).'''
+	for number, line in enumerate(stream, 1):
+		fields = line.split('#')[0].split()
+		if not fields:
+			continue
+		if len(fields) != 4:
+			raise ValueError('Linha %d: esperado "x y z ângulo".' % number)
+		x, y, z, alpha = (float(field) for field in fields)
+		yield (x, y, z), math.pi*alpha/180
+
+def compose_rotations(commands, every=None):
+	'''Compõe as rotações em um único quaternion acumulado, normalizado a cada passo para não acumular erro.
+	Retorna um gerador de pares (passo, quaternion acumulado) a cada every passos e ao final.'''
+	q = Quaternion(1.0, 0.0, 0.0, 0.0)
+	step = 0
+	for axis, angle in commands:
+		#A nova rotação é aplicada depois das anteriores, então multiplica à esquerda.
+		q = axis_angle_quaternion(axis, angle)*q
+		q /= q.norm()
+		step += 1
+		if every and step % every == 0:
+			yield step, q
+	if not every or step % every != 0:
+		yield step, q
+
+def batch_rotation(stream, points, every=None, output=sys.stdout):
+	'''Modo não interativo: lê os comandos de stream e escreve em output os pontos rotacionados pela rotação acumulada a cada every passos e ao final.
+	Os pontos originais nunca são alterados, então não há acúmulo de erro de arredondamento.'''
+	points = np.asarray(points, dtype=float)
+	rotated = np.empty_like(points)
+	for step, q in compose_rotations(read_commands(stream), every):
+		rotate_points_by(points, q, rotated, decimals=6)
+		print('# passo', step, file=output)
+		np.savetxt(output, rotated, fmt='%.6f')
+
+#Vértices originais do cubo.
+CUBE_VERTICES = [(1, 1, 1), (1, 1, -1), (1, -1, 1), (-1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1), (-1, -1, -1)]
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Rotaciona um cubo (ou uma nuvem de pontos) usando quaternions.')
+	parser.add_argument('--batch', nargs='?', const='-', metavar='ARQUIVO',
+						help='lê os comandos "x y z ângulo" do arquivo (ou da entrada padrão) em vez de perguntar ao usuário')
+	parser.add_argument('--every', type=int, metavar='K', help='no modo --batch, escreve os pontos a cada K passos (além do final)')
+	parser.add_argument('--points', metavar='ARQUIVO', help='no modo --batch, arquivo texto com um ponto "x y z" por linha (o padrão é o cubo)')
+	options = parser.parse_args()
+
+	if options.batch is not None:
+		points = np.loadtxt(options.points, ndmin=2) if options.points else CUBE_VERTICES
+		if options.batch == '-':
+			batch_rotation(sys.stdin, points, options.every)
+		else:
+			with open(options.batch, encoding='utf-8') as stream:
+				batch_rotation(stream, points, options.every)
+		sys.exit()
+
+	#Cria-se um objeto com as coordenadas originais do cubo.		
+	solid = Cube(CUBE_VERTICES)
+
+	#A ausência de condição de parada se deve à possibilidade do usuário fazer quantas rotações quiser.
+	while True:
+		line = input('Digite as coordenadas do ponto que, junto com a origem, definem um eixo (separadas por espaço): ').split()
+		for i in range(len(line)):
+			line[i] = float(line[i])
+		alpha = float(input('Digite um ângulo de rotação, em graus: '))
+		solid.rotation(line, math.pi*alpha/180)
+		print(solid.get_vertices())
 	
-	#Cria-se uma nova referência para o objeto solid, agora o cubo rotacionado passa a ser o original e o processo segue.
-	solid = Cube(solid.get_vertices())
+		#Cria-se uma nova referência para o objeto solid, agora o cubo rotacionado passa a ser o original e o processo segue.
+		solid = Cube(solid.get_vertices())
@@ -1,11 +1,14 @@
 '''Run jobs/processors simulations.'''
 
-from queue import Queue
+from abc import ABC, abstractmethod
+from array import array
+import heapq
 import random
-from collections import namedtuple
+from collections import deque, namedtuple
 import sys
 
-from desimul import Calendar, Event, Server
+from columnar import write_job_columns, write_processor_columns
+from desimul import Calendar, Event, EventPool, Server
 
 # Auxiliary simulation classes
 
@@ -39,31 +42,248 @@ class Job:
 		'''Inform the job's priority.'''
 		return self._priority 
 
+
+class JobTable:
+	'''Struct-of-arrays store of job records: one typed array per field
+	(arrival, departure and processing times, priority), jobs being referred
+	to by their integer index. A record costs 28 bytes instead of a Job
+	object with its attribute dictionary.'''
+
+	def __init__(self, capacity=0):
+		'''Create an empty table with room for capacity jobs (it grows if
+		needed).'''
+		nan = float('nan')
+		self._arrival = array('d', [nan])*capacity
+		self._departure = array('d', [nan])*capacity
+		self._processing_time = array('d', [0.0])*capacity
+		self._priority = array('i', [0])*capacity
+		self._size = 0
+
+	def add(self, processing_time, priority):
+		'''Add a job record and return its index.'''
+		index = self._size
+		if index == len(self._priority):
+			# Full: double the capacity of all columns.
+			grow = max(index, 16)
+			nan = float('nan')
+			self._arrival.extend(array('d', [nan])*grow)
+			self._departure.extend(array('d', [nan])*grow)
+			self._processing_time.extend(array('d', [0.0])*grow)
+			self._priority.extend(array('i', [0])*grow)
+		self._processing_time[index] = processing_time
+		self._priority[index] = priority
+		self._size = index + 1
+		return index
+
+	def new_job(self, processing_time, priority):
+		'''Add a job record and return a TableJob referring to it.'''
+		return TableJob(self, self.add(processing_time, priority))
+
+	def set_arrival(self, index, time):
+		'''Record the arrival time of job index.'''
+		self._arrival[index] = time
+
+	def set_departure(self, index, time):
+		'''Record the departure time of job index.'''
+		self._departure[index] = time
+
+	def __len__(self):
+		'''Return the number of jobs.'''
+		return self._size
+
+	def __iter__(self):
+		'''Yield a TableJob for each job, in index order.'''
+		for index in range(self._size):
+			yield TableJob(self, index)
+
+	def columns(self):
+		'''Return the arrival, priority, processing time and departure
+		columns as arrays (copies trimmed to the number of jobs).'''
+		n = self._size
+		return self._arrival[:n], self._priority[:n], self._processing_time[:n], self._departure[:n]
+
+	def write(self, filename='jobs.dat', chunk=65536):
+		'''Write the jobs to filename, one line per job with its arrival
+		time, priority, processing time and start of service (departure
+		minus processing time), with one write call per chunk of lines.'''
+		arrival, priority, processing_time, departure = self.columns()
+		with open(filename, 'w') as outfile:
+			for start in range(0, self._size, chunk):
+				end = min(start + chunk, self._size)
+				outfile.write(''.join(['%r %d %r %r\n' % (a, p, t, d - t) for a, p, t, d in
+									   zip(arrival[start:end], priority[start:end],
+										   processing_time[start:end], departure[start:end])]))
+
+
+class TableJob:
+	'''Job stored in a JobTable. It has the same methods as Job, but only
+	refers to its record, so it can be discarded once the job departs.'''
+
+	__slots__ = ('_table', '_index')
+
+	def __init__(self, table, index):
+		'''Refer to the job record index of table.'''
+		self._table = table
+		self._index = index
+
+	def index(self):
+		'''Return the index of the job in its table.'''
+		return self._index
+
+	def arrival(self, time):
+		'''Called when job arrives.'''
+		self._table._arrival[self._index] = time
+
+	def departure(self, time):
+		'''Called when job departs.'''
+		self._table._departure[self._index] = time
+
+	def report(self):
+		'''Report on arrival and departure times (for statistics).'''
+		return self._table._arrival[self._index], self._table._departure[self._index]
+
+	def processing_time(self):
+		'''Inform the time to process the job.'''
+		return self._table._processing_time[self._index]
+
+	def priority(self):
+		'''Inform the job's priority.'''
+		return self._table._priority[self._index]
+
+# Scheduling policies
+
+class SchedulingPolicy(ABC):
+    '''Base class of the policies deciding which waiting job is served next.
+    All operations are O(1) or O(log n) in the number of waiting jobs.'''
+
+    @abstractmethod
+    def put(self, job, now):
+        '''Insert a job that started waiting at time now.'''
+        pass
+
+    @abstractmethod
+    def get(self, now):
+        '''Remove and return the next job to be served at time now.'''
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        '''Return the number of waiting jobs.'''
+        pass
+
+
+class PriorityFIFO(SchedulingPolicy):
+    '''Any number of priority classes (larger priority is served first), FIFO
+    within each class. With classes 0 and 1 this is the original model.'''
+
+    def __init__(self):
+        '''Create the policy with no waiting jobs.'''
+        self._queues = {}    # One deque of jobs per priority class.
+        self._classes = []   # Heap of the (negated) non-empty classes.
+        self._size = 0
+
+    def put(self, job, now):
+        '''Put the job at the back of the queue of its class.'''
+        priority = job.priority()
+        queue = self._queues.get(priority)
+        if queue is None:
+            queue = self._queues[priority] = deque()
+        if not queue:
+            heapq.heappush(self._classes, -priority)
+        queue.append(job)
+        self._size += 1
+
+    def get(self, now):
+        '''Return the oldest job of the highest non-empty class.'''
+        queue = self._queues[-self._classes[0]]
+        job = queue.popleft()
+        if not queue:
+            heapq.heappop(self._classes)
+        self._size -= 1
+        return job
+
+    def __len__(self):
+        '''Return the number of waiting jobs.'''
+        return self._size
+
+
+class ShortestJobFirst(SchedulingPolicy):
+    '''The job with the smallest processing time is served first (FIFO among
+    equal processing times).'''
+
+    def __init__(self):
+        '''Create the policy with no waiting jobs.'''
+        self._heap = []
+        self._sequence = 0
+
+    def put(self, job, now):
+        '''Insert the job ordered by processing time.'''
+        heapq.heappush(self._heap, (job.processing_time(), self._sequence, job))
+        self._sequence += 1
+
+    def get(self, now):
+        '''Return the shortest waiting job.'''
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        '''Return the number of waiting jobs.'''
+        return len(self._heap)
+
+
+class PriorityAging(SchedulingPolicy):
+    '''Priority classes with aging: a job waiting since time t has effective
+    priority priority + rate*(now - t) and the largest one is served first.
+    Since rate*now is the same for all jobs, the order only depends on
+    priority - rate*t, which is fixed when the job is inserted, so a heap
+    keeps it without ever being updated.'''
+
+    def __init__(self, rate):
+        '''Create the policy; rate is the priority gained per time unit.'''
+        self._rate = rate
+        self._heap = []
+        self._sequence = 0
+
+    def put(self, job, now):
+        '''Insert the job ordered by its aging key.'''
+        key = self._rate*now - job.priority()
+        heapq.heappush(self._heap, (key, self._sequence, job))
+        self._sequence += 1
+
+    def get(self, now):
+        '''Return the job with largest effective priority.'''
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        '''Return the number of waiting jobs.'''
+        return len(self._heap)
+
+
 # Server classes
 
 class QueueingSystem(Server):
     '''Abstract base class for job queueing system.'''
 
-    def __init__(self, calendar):
-        '''Creates a queue associated with the given calendar.'''
+    def __init__(self, calendar, policy=None):
+        '''Creates a queue associated with the given calendar. Waiting jobs are
+        served according to policy (a SchedulingPolicy, PriorityFIFO by
+        default).'''
         Server.__init__(self, calendar)
-        self._free_processors = Queue()  # This stores the free processors.
-        self._queue_priority = Queue()   # This stores the priority jobs.
-        self._queue_normal = Queue()     # This stores the normal jobs.
+        self._free_processors = deque()  # This stores the free processors.
+        if policy is None:
+            policy = PriorityFIFO()
+        self._policy = policy            # This stores the waiting jobs.
 
     def new_job(self, job):
         '''A new job to process. Either send it to a free processor (if
         available) or to the waiting queue.'''
-        if self._free_processors.empty():
+        if not self._free_processors:
             # No free processors. Put job on the queue.
             self.enqueue(job)
         else:
             # There is a free processor. Send job to them.
-            processor = self._free_processors.get()
-            cal = self.calendar()
-            now = cal.current_time()
-            event = JobToProcessorEvent(now, processor, job)
-            cal.put(event)
+            processor = self._free_processors.popleft()
+            now = self.calendar().current_time()
+            self.schedule(JobToProcessorEvent, now, processor, job)
 
     def free_processor(self, processor):
         '''A new free processor. Send it a job (if one is waiting) or put it in
@@ -71,40 +291,36 @@ class QueueingSystem(Server):
         if self.has_waiting_job(processor):
             # There is a job waiting.
             job = self.get_next_job(processor)
-            cal = self.calendar()
-            now = cal.current_time()
-            event = JobToProcessorEvent(now, processor, job)
-            cal.put(event)
+            now = self.calendar().current_time()
+            self.schedule(JobToProcessorEvent, now, processor, job)
         else:
             # No job waiting. Put processor in the free processors queue.
-            self._free_processors.put(processor)
+            self._free_processors.append(processor)
 
     def enqueue(self, job):
-        '''Put the job at the back of the queue according its priority.'''
-        if job.priority() == 1:
-            self._queue_priority.put(job)
-        if job.priority() == 0:
-            self._queue_normal.put(job)
+        '''Put the job in the waiting queue, according to the policy.'''
+        self._policy.put(job, self.calendar().current_time())
 
     def has_waiting_job(self, processor):
         '''Verify if the processor has a waiting job.'''
-        return not self._queue_priority.empty() or not self._queue_normal.empty()
+        return len(self._policy) > 0
 
     def get_next_job(self, processor):
-        '''Get the next job for the given processor, first verifying if there are any priority jobs.'''
-        if not self._queue_priority.empty():
-            return self._queue_priority.get()
-        elif not self._queue_normal.empty():
-            return self._queue_normal.get()
+        '''Get the next job for the given processor, as chosen by the policy.'''
+        return self._policy.get(self.calendar().current_time())
 
 class Processor(Server):
 	'''Processors know how to process a job.'''
 
-	def __init__(self, calendar, queue):
-		'''Create a processor server associated with the given calendar and queue.'''
+	def __init__(self, calendar, queue, collector=None):
+		'''Create a processor server associated with the given calendar and queue.
+		Served jobs and idle periods are reported to collector, if given.'''
 		Server.__init__(self, calendar)
 		self._queue = queue
-		self._free_time = []
+		self._collector = collector
+		if collector is not None:
+			collector.add_processor(self)
+		self._free_time = 0.0
 		self._last_attending = 0.0
 		self.quantity = 0
 		self.priority_quantity = 0
@@ -113,28 +329,68 @@ class Processor(Server):
 		'''Do the process required by the job (takes time). Afterwards, notify
         queue about free status.'''
 		curr_time = self.calendar().current_time()
-		self._free_time.append(curr_time - self._last_attending)
+		idle_time = curr_time - self._last_attending
+		self._free_time += idle_time
 		time_to_finish = job.processing_time()
 		finish_time = curr_time + time_to_finish
 		job.departure(finish_time)
-		event = ProcessorFreeEvent(finish_time, self._queue, self)
-		self.calendar().put(event)
+		if self._collector is not None:
+			self._collector.idle(self, idle_time)
+			self._collector.job_served(self, job, job.report()[0], curr_time, finish_time)
+		self.schedule(ProcessorFreeEvent, finish_time, self._queue, self)
 		self._last_attending = finish_time
 		self.quantity += 1
 		if job.priority() == 1:
 			self.priority_quantity += 1
         
 
-	def free_times(self):
-		'''Return a list of all idle interval lengths.'''
+	def total_free_time(self):
+		'''Return the sum of all idle interval lengths.'''
 		return self._free_time
 
+	def set_collector(self, collector):
+		'''Report the next served jobs and idle periods to collector (None to
+		stop reporting).'''
+		self._collector = collector
+		if collector is not None:
+			collector.add_processor(self)
+
+
+class ArrivalSource(Server):
+    '''Generates job arrivals lazily. Only the next arrival is kept in the
+    calendar; when it is processed the job is passed to the queueing system
+    and the following arrival is scheduled.'''
+
+    def __init__(self, calendar, queue, arrivals):
+        '''Create a source feeding the given queue from an iterator of
+        (arrival time, job) pairs in nondecreasing time order.'''
+        Server.__init__(self, calendar)
+        self._queue = queue
+        self._arrivals = iter(arrivals)
+
+    def start(self):
+        '''Schedule the first arrival.'''
+        self.schedule_next()
+
+    def schedule_next(self):
+        '''Schedule the next arrival, if the iterator is not exhausted.'''
+        for time, job in self._arrivals:
+            self.schedule(JobArrivalEvent, time, self, job)
+            break
+
+    def new_job(self, job):
+        '''Called by the arrival event. Forward job to the queueing system.'''
+        self._queue.new_job(job)
+        self.schedule_next()
+
 
 # Event types
 
 class JobArrivalEvent(Event):
     '''A job has arrived.'''
 
+    __slots__ = ('_job',)
+
     def __init__(self, time, queue, job):
         '''Creates an event of the given job arriving at the given queue at
         the given time'''
@@ -150,6 +406,8 @@ class JobArrivalEvent(Event):
 class JobToProcessorEvent(Event):
     '''Job is sent to a free processor.'''
 
+    __slots__ = ('_job',)
+
     def __init__(self, time, processor, job):
         '''Create an event of a given processor starting to execute a given
         job at a given time.'''
@@ -164,6 +422,8 @@ class JobToProcessorEvent(Event):
 class ProcessorFreeEvent(Event):
     '''A processor has become free.'''
 
+    __slots__ = ('_free_processor',)
+
     def __init__(self, time, queue, processor):
         '''Creates an event of a given processor becoming free.'''
         Event.__init__(self, time, queue)
@@ -182,87 +442,233 @@ Processor_par = namedtuple('Processor_par', ['number'])
 # Auxiliary writing functions
 
 
-def write_job_data(jobs):
-    '''Writes job timing and priority information to file 'jobs.dat'.'''
-
-    with open('jobs.dat', 'w') as outfile:
-        for job in jobs:
-            arrival, departure = job.report()
-            print(arrival, job.priority(), job.processing_time(), departure - job.processing_time(), file=outfile)
-
-
 def write_free_times(processors):
     '''"Writes processor information to file 'processors.dat'.'''
 
     with open('processors.dat', 'w') as outfile:
         for processor in processors:
-            freetimes = processor.free_times()
-            total_free_time = sum(freetimes)
+            total_free_time = processor.total_free_time()
             print(processor.quantity, processor.priority_quantity, total_free_time, file=outfile)
 
 
 # Perform a simulation and save results
 
-def simple_simulation(processors_p, jobs_p):
-    '''Perform simulation for the given queueing system, processor and job
-    parameters. Save the results in files 'processors.dat' and 'jobs.dat'.'''
+SimulationResult = namedtuple('SimulationResult', ['jobs', 'processors', 'end_time'])
+
 
-    # Create simulation infrastructure.
-    calendar = Calendar()
-    queue = QueueingSystem(calendar)
+def build_system(calendar, processors_p, collector=None, policy=None):
+    '''Create the queueing system and the processors on calendar, all of them
+    free at time 0.0, and return them as (queue, processors).'''
+    queue = QueueingSystem(calendar, policy)
 
     # Create all processors.
-    processors = [Processor(calendar, queue)
+    processors = [Processor(calendar, queue, collector)
                for i in range(processors_p.number)]
 
     # Insert initial events of free processor for all processors (ready to work).
     for processor in processors:
         calendar.put(ProcessorFreeEvent(0.0, queue, processor))
+    return queue, processors
 
-    # Create all jobs.
-    jobs = [Job(next(jobs_p.time), next(jobs_p.priority)) for i in range(jobs_p.number)]
 
-    # Create the events of job arrival for all jobs.
-    for i, job in enumerate(jobs):
-        calendar.put(JobArrivalEvent(next(jobs_p.arrival), queue, job))
+def simple_simulation(processors_p, jobs_p, save=True, collector=None, keep_jobs=False,
+                      profile=False, policy=None, binary=False):
+    '''Perform simulation for the given queueing system, processor and job
+    parameters. Save the results in files 'processors.dat' and 'jobs.dat'
+    (unless save is False) and return them as a SimulationResult.
+
+    Served jobs are reported to collector (an onlinestats.SimulationStatistics)
+    if given. If save or keep_jobs is set the jobs are kept in a JobTable,
+    otherwise they are discarded after being processed and the result has
+    jobs set to None. If profile is
+    set, the calendar is profiled and a summary is printed at the end. Waiting
+    jobs are served according to policy (see QueueingSystem). If binary is
+    set, the results are saved in the binary columnar format of the columnar
+    module instead of the text files.'''
+
+    # Create simulation infrastructure. Processed events are recycled.
+    calendar = Calendar(pool=EventPool())
+    if profile:
+        calendar.enable_profiling()
+    queue, processors = build_system(calendar, processors_p, collector, policy)
+
+    # Jobs are created as they arrive, only kept (in a JobTable) if they must
+    # be saved.
+    jobs = JobTable(jobs_p.number) if save or keep_jobs else None
+    ArrivalSource(calendar, queue, JobArrivals(jobs_p, jobs)).start()
 
     # Process all events until finished.
     calendar.process_all_events()
 
-    # Write results to files.
-    write_job_data(jobs)
-    write_free_times(processors)
-
-    print('Total simulation time for this test is', calendar.current_time())
+    if save:
+        # Write results to files.
+        if binary:
+            write_job_columns(jobs)
+            write_processor_columns([(processor.quantity, processor.priority_quantity, processor.total_free_time())
+                                     for processor in processors])
+        else:
+            jobs.write('jobs.dat')
+            write_free_times(processors)
+
+        print('Total simulation time for this test is', calendar.current_time())
+
+    if profile:
+        print(calendar.profile().summary())
+
+    return SimulationResult(jobs, processors, calendar.current_time())
+
+
+# Job parameters
+
+class JobArrivals:
+	'''Iterator of (arrival time, job) pairs built from the job parameters.
+	Jobs are stored in table (a JobTable) if given, otherwise they are Job
+	objects. Like the samplers below it keeps its state in attributes, so it
+	can be pickled (generators cannot) when its parameters can.'''
+
+	def __init__(self, jobs_p, table=None):
+		'''Create the arrivals of the jobs_p.number jobs.'''
+		self._jobs_p = jobs_p
+		self._table = table
+		self._left = jobs_p.number
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		'''Draw the processing time and priority of the next job, then its
+		arrival time.'''
+		if self._left == 0:
+			raise StopIteration
+		self._left -= 1
+		jobs_p = self._jobs_p
+		if self._table is not None:
+			job = self._table.new_job(next(jobs_p.time), next(jobs_p.priority))
+		else:
+			job = Job(next(jobs_p.time), next(jobs_p.priority))
+		return next(jobs_p.arrival), job
+
+
+class GaussTimes:
+	'''Iterator of n normally distributed processing times.'''
+
+	def __init__(self, n, tau, sigma, rng=random):
+		'''Draw the times from rng.'''
+		self._left = n
+		self._tau = tau
+		self._sigma = sigma
+		self._rng = rng
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		'''Draw the next processing time.'''
+		if self._left == 0:
+			raise StopIteration
+		self._left -= 1
+		return self._rng.gauss(self._tau, self._sigma)
+
+
+class UniformArrivals:
+	'''Iterator of n uniform arrival times in [0, T) already in increasing
+	order, without sorting: each one is the minimum of the remaining uniforms
+	above the previous one.'''
+
+	def __init__(self, n, T, rng=random):
+		'''Draw the times from rng.'''
+		self._left = n
+		self._T = T
+		self._rng = rng
+		self._u = 0.0     # Last uniform order statistic.
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		'''Draw the next arrival time.'''
+		if self._left == 0:
+			raise StopIteration
+		self._u += (1.0 - self._u)*(1.0 - self._rng.random()**(1.0/self._left))
+		self._left -= 1
+		return self._T*self._u
+
+
+class ShuffledPriorities:
+	'''Iterator over a random permutation of m zeros and k ones, one at a
+	time.'''
+
+	def __init__(self, m, k, rng=random):
+		'''Draw the permutation from rng.'''
+		self._zeros = m
+		self._ones = k
+		self._rng = rng
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		'''Draw the next priority.'''
+		m, k = self._zeros, self._ones
+		if m + k == 0:
+			raise StopIteration
+		if self._rng.random()*(m + k) < k:
+			self._ones -= 1
+			return 1
+		self._zeros -= 1
+		return 0
+
+
+def make_job_parameters(tau, sigma, T, m, alpha, rng=random):
+	'''Parameters of m normal and m//alpha priority jobs, drawn lazily from
+	the random generator rng (the global random module by default). With a
+	random.Random they can be pickled, e.g. in a checkpoint.'''
+	n = m + m//alpha
+	return Job_par(n, GaussTimes(n, tau, sigma, rng), UniformArrivals(n, T, rng), ShuffledPriorities(m, m//alpha, rng))
 
 
 # Code to run
 
 if __name__ == '__main__':
 	
-	#Read the parameters from command line.
-	p, tau, sigma, T, m, alpha = sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6]
-	p, tau, sigma, T, m, alpha = int(p), float(tau), float(sigma), float(T), int(m), int(alpha)
-	
-	def get_collection_number(collection):
-		'''Yields a number that could be the arrival time, the processing time or the priority.'''
-		counter = 1
-		while counter <= len(collection):
-			yield collection[counter - 1]
-			counter += 1
-	
-	#List that contains the processing times.		
-	collection_time = [random.gauss(tau, sigma) for i in range(m + m//alpha)]
-	
-	#List that contains the arrival times.
-	collection_arrival_time = [T*random.random() for x in range(m + m//alpha)]
-	collection_arrival_time.sort()
-	
-	#List of job's priority, where shuffle() make the senquence of priorities be random.
-	collection_zero = [0]*m
-	collection_one = [1]*(m//alpha)
-	collection_priority = collection_zero + collection_one
-	random.shuffle(collection_priority)
-
-	# Run simulation configurations.
-	simple_simulation(Processor_par(p), Job_par(m + m//alpha, get_collection_number(collection_time), get_collection_number(collection_arrival_time), get_collection_number(collection_priority)))
+	#Read the parameters from command line (options start with '--', those
+	#with a value are written '--name=value').
+	options = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+	args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+	values = dict(option[2:].split('=', 1) for option in options if '=' in option)
+	p = int(args[0])
+
+	# Job parameters: '--trace=PREFIX' replays a recorded binary trace (then
+	# only p is given). Otherwise they are drawn by make_job_parameters (normal
+	# processing times, not truncated), the default, from a random.Random
+	# seeded by '--seed=N'. '--vectorized' samples them instead with the
+	# workload module (needs NumPy; normal times are truncated at zero and
+	# '--seed' seeds NumPy streams), which also accepts
+	# '--times=normal|exponential|lognormal' and '--arrivals=uniform|poisson'.
+	vectorized = '--vectorized' in options or 'times' in values or 'arrivals' in values
+	if 'trace' in values:
+		import workload
+		jobs_p = workload.read_trace(values['trace'])
+	else:
+		tau, sigma, T, m, alpha = args[1], args[2], args[3], args[4], args[5]
+		tau, sigma, T, m, alpha = float(tau), float(sigma), float(T), int(m), int(alpha)
+		seed = int(values['seed']) if 'seed' in values else None
+		if vectorized:
+			import workload
+			jobs_p = workload.make_job_parameters(tau, sigma, T, m, alpha, seed, values.get('times', 'normal'),
+												  values.get('arrivals', 'uniform'))
+		else:
+			jobs_p = make_job_parameters(tau, sigma, T, m, alpha, random.Random(seed))
+
+	# Run simulation configurations. '--binary' saves the results in the
+	# binary columnar format (see columnar.py) instead of text.
+	binary = '--binary' in options
+	if '--fast' in options:
+		# Event-free kernel, same results as the reference simulation.
+		from fastsim import fast_simulation
+		if '--profile' in options:
+			print('Profiling is only available for the event-driven simulation.')
+		fast_simulation(Processor_par(p), jobs_p, binary=binary)
+	else:
+		# '--profile' prints a summary of the calendar activity.
+		simple_simulation(Processor_par(p), jobs_p, profile='--profile' in options, binary=binary)
@@ -0,0 +1,292 @@
+'''Benchmarks for desimul, the jobs/processors simulation and the quaternion
+code, with machine-readable baselines to detect slowdowns.
+
+Usage:
+    python benchmark.py [--max-jobs E] [--save FILE] [--compare FILE] [--threshold X]
+
+Simulations are run for 10^3 up to 10^E jobs (E is 5 by default, 7 for the
+full grid), for several numbers of processors and priority ratios alpha. Each
+simulation case runs in a fresh worker process, so that its peak memory (peak
+resident set size) can be measured without tracing overhead. Calendar cases
+report the peak memory allocated while processing their events (traced with
+tracemalloc in a separate, untimed run). --save writes the results to a JSON
+baseline; --compare reports every result that got slower, or whose peak memory
+grew, by more than the threshold (10% by default) compared with the baseline
+and exits with status 1 if there is any.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from desimul import Calendar, Event, EventPool, Server
+from fastsim import fast_simulation
+from quaternion import Quaternion
+from Trabalho3_POO import (ArrivalSource, JobArrivals, Processor_par, build_system,
+                           make_job_parameters, simple_simulation)
+
+PROCESSORS = (1, 4, 16)
+ALPHAS = (2, 10)
+TAU, SIGMA, LOAD = 1.0, 0.1, 0.9
+
+
+def best_time(function, repeat=3):
+    '''Return the smallest wall-clock time of several calls to function.'''
+    best = math.inf
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory():
+    '''Return the peak resident set size of this process in bytes (None if
+    unknown).'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else 1024*peak
+
+
+# Calendar
+
+class HoldEvent(Event):
+    '''Event that schedules a new one for its server when processed.'''
+
+    __slots__ = ()
+
+    def process(self):
+        '''Ask the server for a new event.'''
+        self.server().hold()
+
+
+class HoldServer(Server):
+    '''Keeps the calendar size constant, as in the classic hold benchmark.'''
+
+    def __init__(self, calendar, events, rng):
+        '''Server that will process the given number of events.'''
+        Server.__init__(self, calendar)
+        self._left = events
+        self._rng = rng
+
+    def hold(self):
+        '''Schedule a new event a random time in the future.'''
+        if self._left > 0:
+            self._left -= 1
+            cal = self.calendar()
+            cal.put(HoldEvent(cal.current_time() + self._rng.expovariate(1.0), self))
+
+
+class TimeoutServer(HoldServer):
+    '''Hold model where every event also schedules a timeout that is
+    cancelled before it fires (as with reneging or preemption).'''
+
+    def __init__(self, calendar, events, rng):
+        '''Server that will process the given number of events.'''
+        HoldServer.__init__(self, calendar, events, rng)
+        self._timeouts = []
+
+    def hold(self):
+        '''Cancel the oldest timeout and schedule a new event and timeout.'''
+        cal = self.calendar()
+        if self._timeouts:
+            cal.cancel(self._timeouts.pop())
+        if self._left > 0:
+            self._left -= 1
+            now = cal.current_time()
+            cal.put(HoldEvent(now + self._rng.expovariate(1.0), self))
+            self._timeouts.append(cal.put(HoldEvent(now + 1000.0, self)))
+
+
+def bench_calendar(size, events, server_class=HoldServer):
+    '''Events per second and peak memory of a calendar holding size
+    events.'''
+    def run():
+        rng = random.Random(1)
+        calendar = Calendar()
+        server = server_class(calendar, events - size, rng)
+        calendar.put_many(HoldEvent(rng.expovariate(1.0), server) for i in range(size))
+        calendar.process_all_events()
+    value = events/best_time(run)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'value': value, 'unit': 'events/s', 'peak_memory': peak}
+
+
+# Simulation
+
+def simulation_case(kernel, jobs, processors, alpha):
+    '''Run one simulation case (in a worker process) and return its
+    throughput and peak memory.'''
+    m = max(1, round(jobs*alpha/(alpha + 1)))  # m + m//alpha is about jobs
+    n = m + m//alpha
+    T = n*TAU/(processors*LOAD)
+    simulate = fast_simulation if kernel == 'fast' else simple_simulation
+
+    def run():
+        jobs_p = make_job_parameters(TAU, SIGMA, T, m, alpha, random.Random(1))
+        simulate(Processor_par(processors), jobs_p, save=False)
+    elapsed = best_time(run, 3 if n <= 100000 else 1)
+    result = {'value': n/elapsed, 'unit': 'jobs/s', 'peak_memory': peak_memory()}
+    if kernel == 'events':
+        jobs_p = make_job_parameters(TAU, SIGMA, T, m, alpha, random.Random(1))
+        result['events_per_second'] = count_events(Processor_par(processors), jobs_p)/elapsed
+    return result
+
+
+def count_events(processors_p, jobs_p):
+    '''Return the number of events processed by simple_simulation for the
+    given parameters, counted by a profiled (untimed) run of the same model.'''
+    calendar = Calendar(pool=EventPool())
+    profile = calendar.enable_profiling()
+    queue, processors = build_system(calendar, processors_p)
+    ArrivalSource(calendar, queue, JobArrivals(jobs_p)).start()
+    calendar.process_all_events()
+    return profile.events()
+
+
+def bench_simulations(max_exponent):
+    '''Run the grid of simulation cases, one fresh process per case.'''
+    cases = [(kernel, 10**e, p, alpha)
+             for kernel in ('events', 'fast')
+             for e in range(3, max_exponent + 1)
+             for p in PROCESSORS
+             for alpha in ALPHAS]
+    results = {}
+    spawn = multiprocessing.get_context('spawn')  # Do not inherit our memory
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn, max_tasks_per_child=1) as pool:
+        for case, result in zip(cases, pool.map(simulation_case, *zip(*cases))):
+            results['simulation/%s/jobs=%d/p=%d/alpha=%d' % case] = result
+            print('simulation/%s/jobs=%d/p=%d/alpha=%d' % case, format_result(result), flush=True)
+    return results
+
+
+# Quaternions
+
+def bench_quaternion(operations):
+    '''Operations per second of the quaternion operators.'''
+    q = Quaternion(0.5, 0.5, -0.5, 0.5)
+    r = Quaternion(1.0, 2.0, 3.0, 4.0)
+    cases = {
+        'add': lambda: q + r,
+        'mul': lambda: q*r,
+        'mul_scalar': lambda: q*2.5,
+        'inverse': lambda: r.inverse(),
+        'truediv': lambda: q/r,
+    }
+    results = {}
+    for name, operation in cases.items():
+        def run():
+            for i in range(operations):
+                operation()
+        results['quaternion/' + name] = {'value': operations/best_time(run), 'unit': 'ops/s'}
+    return results
+
+
+def bench_cube(rotations):
+    '''Rotations per second of Cube.rotation.'''
+    from Trabalho2_POO import Cube
+    vertices = [(1, 1, 1), (1, 1, -1), (1, -1, 1), (-1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1), (-1, -1, -1)]
+
+    def run():
+        for i in range(rotations):
+            Cube(vertices).rotation([1.0, 2.0, 3.0], 0.3)
+    return {'value': rotations/best_time(run), 'unit': 'rotations/s'}
+
+
+# Results
+
+def format_result(result):
+    '''Format a result for printing.'''
+    text = '%.4g %s' % (result['value'], result['unit'])
+    if result.get('peak_memory'):
+        text += ', peak memory %.1f MiB' % (result['peak_memory']/2**20)
+    return text
+
+
+def compare(results, baseline, threshold):
+    '''Return the list of (name, measure, baseline value, new value) of
+    results that are slower (measure 'value') or use more peak memory
+    (measure 'peak_memory') than the baseline by more than threshold (a
+    fraction).'''
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if result['value'] < old['value']*(1 - threshold):
+            regressions.append((name, 'value', old['value'], result['value']))
+        if result.get('peak_memory') and old.get('peak_memory') \
+                and result['peak_memory'] > old['peak_memory']*(1 + threshold):
+            regressions.append((name, 'peak_memory', old['peak_memory'], result['peak_memory']))
+    return regressions
+
+
+def run_all(max_exponent):
+    '''Run all benchmarks and return the results dict.'''
+    results = {}
+    for size in (10, 1000, 100000):
+        name = 'calendar/hold/size=%d' % size
+        results[name] = bench_calendar(size, max(200000, 2*size))
+        print(name, format_result(results[name]), flush=True)
+    results['calendar/cancel/size=1000'] = bench_calendar(1000, 200000, TimeoutServer)
+    print('calendar/cancel/size=1000', format_result(results['calendar/cancel/size=1000']), flush=True)
+    for name, result in bench_quaternion(100000).items():
+        results[name] = result
+        print(name, format_result(result), flush=True)
+    results['cube/rotation'] = bench_cube(10000)
+    print('cube/rotation', format_result(results['cube/rotation']), flush=True)
+    results.update(bench_simulations(max_exponent))
+    return results
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Run the benchmarks.')
+    parser.add_argument('--max-jobs', type=int, default=5, metavar='E',
+                        help='largest simulation has 10^E jobs (default 5)')
+    parser.add_argument('--save', metavar='FILE', help='write results to a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown or memory growth fraction reported as regression (default 0.1)')
+    options = parser.parse_args()
+
+    results = run_all(options.max_jobs)
+
+    if options.save:
+        with open(options.save, 'w') as outfile:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'results': results}, outfile, indent=1, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare) as infile:
+            baseline = json.load(infile)['results']
+        regressions = compare(results, baseline, options.threshold)
+        for name, measure, old, new in regressions:
+            if measure == 'value':
+                print('REGRESSION %s: %.4g -> %.4g (%.1f%% slower)' % (name, old, new, 100*(1 - new/old)))
+            else:
+                print('REGRESSION %s: peak memory %.1f -> %.1f MiB (%.1f%% more)'
+                      % (name, old/2**20, new/2**20, 100*(new/old - 1)))
+        if regressions:
+            sys.exit(1)
+        print('No regressions beyond %.0f%%.' % (100*options.threshold))
@@ -0,0 +1,125 @@
+'''Checkpoint and restore of the jobs/processors simulation of Trabalho3_POO.
+
+A Simulation can be run up to any simulated time, saved to a compressed file
+and restored later, in the same or in another process, to continue as if it
+had never stopped: the saved state is the calendar (scheduled events and
+current time), the waiting jobs of the queueing system, the processors and
+their counters, the job table and the random generator of the arrivals.
+Restoring the same checkpoint several times (reseeding each copy) forks
+independent runs that share the warm-up.
+
+Checkpoints are pickles: only restore files from a trusted source.
+
+Usage:
+    python checkpoint.py save FILE TIME p tau sigma T m alpha [seed]
+    python checkpoint.py run FILE [seed]
+'''
+
+import gzip
+import pickle
+import random
+import sys
+
+from desimul import Calendar, EventPool, advance_sequence, next_sequence
+from Trabalho3_POO import (ArrivalSource, JobArrivals, JobTable, Processor_par, SimulationResult,
+                           build_system, make_job_parameters, write_free_times)
+
+# First element of a checkpoint, identifying the file and its format version.
+FORMAT = ('Trabalho3_POO checkpoint', 1)
+
+
+class Simulation:
+    '''A run of the simulation that can be saved and restored at any
+    simulated time.'''
+
+    def __init__(self, processors_p, tau, sigma, T, m, alpha, rng=None, keep_jobs=True,
+                 collector=None, policy=None):
+        '''Set up the simulation of simple_simulation, with the jobs of
+        make_job_parameters drawn from rng (a random.Random, a fresh one by
+        default). If keep_jobs is set the jobs are kept in a JobTable.'''
+        if rng is None:
+            rng = random.Random()
+        self._rng = rng
+        self._calendar = Calendar(pool=EventPool())
+        self._queue, self._processors = build_system(self._calendar, processors_p, collector, policy)
+        jobs_p = make_job_parameters(tau, sigma, T, m, alpha, rng)
+        self._jobs = JobTable(jobs_p.number) if keep_jobs else None
+        ArrivalSource(self._calendar, self._queue, JobArrivals(jobs_p, self._jobs)).start()
+
+    def calendar(self):
+        '''Return the calendar of the simulation.'''
+        return self._calendar
+
+    def run_until(self, time):
+        '''Process the events up to the given simulated time.'''
+        self._calendar.process_events_until(time)
+
+    def run(self):
+        '''Process all remaining events and return the SimulationResult.'''
+        self._calendar.process_all_events()
+        return self.result()
+
+    def result(self):
+        '''Return the current state as a SimulationResult.'''
+        return SimulationResult(self._jobs, self._processors, self._calendar.current_time())
+
+    def set_collector(self, collector):
+        '''Report the next served jobs to collector (e.g. a fresh
+        SimulationStatistics after restoring a warmed-up state).'''
+        for processor in self._processors:
+            processor.set_collector(collector)
+
+    def reseed(self, seed):
+        '''Draw the remaining jobs from a new random stream.'''
+        self._rng.seed(seed)
+
+    def save(self, filename):
+        '''Write the state of the simulation to a checkpoint file.'''
+        with gzip.open(filename, 'wb') as outfile:
+            pickle.dump((FORMAT, next_sequence(), self), outfile, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def restore(filename):
+        '''Return the Simulation saved in a checkpoint file.'''
+        with gzip.open(filename, 'rb') as infile:
+            header, sequence, simulation = pickle.load(infile)
+        if header != FORMAT:
+            raise ValueError('%s is not a checkpoint of this version.' % filename)
+        # Events created from now on must be ordered after the saved ones.
+        advance_sequence(sequence)
+        return simulation
+
+
+def fork(filename, seeds):
+    '''Yield one Simulation restored from the checkpoint file for each seed,
+    reseeded with it.'''
+    for seed in seeds:
+        simulation = Simulation.restore(filename)
+        simulation.reseed(seed)
+        yield simulation
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    if sys.argv[1] == 'save':
+        # Run the warm-up up to TIME and save it.
+        filename, time = sys.argv[2], float(sys.argv[3])
+        p, tau, sigma, T, m, alpha = sys.argv[4:10]
+        p, tau, sigma, T, m, alpha = int(p), float(tau), float(sigma), float(T), int(m), int(alpha)
+        seed = int(sys.argv[10]) if len(sys.argv) > 10 else None
+        simulation = Simulation(Processor_par(p), tau, sigma, T, m, alpha, random.Random(seed))
+        simulation.run_until(time)
+        simulation.save(filename)
+        print('Saved state at time', simulation.calendar().current_time())
+    else:
+        # Continue a saved run (optionally reseeded) and save the results as
+        # simple_simulation does.
+        simulation = Simulation.restore(sys.argv[2])
+        if len(sys.argv) > 3:
+            simulation.reseed(int(sys.argv[3]))
+        jobs, processors, end_time = simulation.run()
+        jobs.write('jobs.dat')
+        write_free_times(processors)
+        print('Total simulation time for this test is', end_time)
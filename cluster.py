@@ -0,0 +1,130 @@
+'''Cluster of jobs/processors queueing systems with job migration, run in
+parallel with pdes.
+
+The cluster has a number of nodes, each a Trabalho3_POO queueing system with
+its own processors and job arrivals (from an independent random stream). A
+job that arrives at a node with no free processor and at least threshold
+waiting jobs migrates to the next node, arriving there after the transfer
+delay; a job migrates at most hops times. Nodes are split among the logical
+processes in contiguous blocks and the transfer delay is the lookahead.
+
+Usage:
+    python cluster.py nodes partitions p tau sigma T m alpha delay threshold [seed]
+'''
+
+from functools import partial
+import sys
+import time
+
+from pdes import run_parallel, run_reference, run_sequential
+from replication import stream
+from Trabalho3_POO import (ArrivalSource, Job, JobArrivalEvent, Processor,
+                           ProcessorFreeEvent, QueueingSystem, make_job_parameters)
+
+
+class ClusterJob(Job):
+    '''Job that remembers how many times it has migrated.'''
+
+    def __init__(self, processing_time, priority):
+        '''Create a job that has not migrated yet.'''
+        Job.__init__(self, processing_time, priority)
+        self.hops = 0
+
+
+class ClusterNode(QueueingSystem):
+    '''Queueing system that sends jobs to the next node when overloaded.'''
+
+    def __init__(self, lp, node, nodes, delay, threshold, hops):
+        '''Create node number node (out of nodes) in logical process lp.'''
+        QueueingSystem.__init__(self, lp.calendar())
+        self._lp = lp
+        self._target = (node + 1) % nodes
+        self._target_lp = node_partition(self._target, nodes, lp.partitions())
+        self._delay = delay
+        self._threshold = threshold
+        self._hops = hops
+        self.migrated = 0
+
+    def new_job(self, job):
+        '''Migrate the job if the node is overloaded, otherwise queue or serve
+        it as usual.'''
+        if (not self._free_processors and len(self._policy) >= self._threshold
+                and job.hops < self._hops):
+            job.hops += 1
+            self.migrated += 1
+            now = self.calendar().current_time()
+            self._lp.send(self._target_lp, 'node%d' % self._target, now + self._delay, JobArrivalEvent, job)
+        else:
+            QueueingSystem.new_job(self, job)
+
+
+def node_partition(node, nodes, partitions):
+    '''Return the logical process of a node.'''
+    return node*partitions//nodes
+
+
+def cluster_arrivals(jobs_p):
+    '''Yields (arrival time, job) pairs of ClusterJobs.'''
+    for i in range(jobs_p.number):
+        yield next(jobs_p.arrival), ClusterJob(next(jobs_p.time), next(jobs_p.priority))
+
+
+def cluster_model(lp, nodes, p, tau, sigma, T, m, alpha, delay, threshold, hops=1, seed=0):
+    '''pdes model: create the nodes of logical process lp. The result of the
+    LP is a list, per node, of (migrated jobs, [(quantity, priority quantity,
+    total free time) of each processor]).'''
+    calendar = lp.calendar()
+    created = []
+    for node in range(nodes):
+        if node_partition(node, nodes, lp.partitions()) != lp.index():
+            continue
+        queue = ClusterNode(lp, node, nodes, delay, threshold, hops)
+        lp.register('node%d' % node, queue)
+        processors = [Processor(calendar, queue) for i in range(p)]
+        for processor in processors:
+            calendar.put(ProcessorFreeEvent(0.0, queue, processor))
+        jobs_p = make_job_parameters(tau, sigma, T, m, alpha, stream(seed, node))
+        ArrivalSource(calendar, queue, cluster_arrivals(jobs_p)).start()
+        created.append((queue, processors))
+
+    def collect():
+        '''Statistics of the nodes of this LP.'''
+        return [(queue.migrated, [(processor.quantity, processor.priority_quantity, processor.total_free_time())
+                                  for processor in processors])
+                for queue, processors in created]
+    return collect
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    # Runs the cluster as a plain (windowless) simulation, sequentially and
+    # in parallel, and checks that the windowed runs agree with the plain one
+    # and with each other.
+    nodes, partitions, p = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+    tau, sigma, T = float(sys.argv[4]), float(sys.argv[5]), float(sys.argv[6])
+    m, alpha = int(sys.argv[7]), int(sys.argv[8])
+    delay, threshold = float(sys.argv[9]), int(sys.argv[10])
+    seed = int(sys.argv[11]) if len(sys.argv) > 11 else 0
+    model = partial(cluster_model, nodes=nodes, p=p, tau=tau, sigma=sigma, T=T, m=m, alpha=alpha,
+                    delay=delay, threshold=threshold, seed=seed)
+
+    reference = run_reference(model, partitions, delay)
+    start = time.perf_counter()
+    sequential = run_sequential(model, partitions, delay)
+    middle = time.perf_counter()
+    parallel = run_parallel(model, partitions, delay)
+    end = time.perf_counter()
+
+    migrated = sum(node[0] for result in parallel.results for node in result)
+    print('Total simulation time for this test is', parallel.end_time)
+    print('%d windows, %d migrated jobs' % (parallel.windows, migrated))
+    print('sequential %.3f s, parallel %.3f s' % (middle - start, end - middle))
+    if (parallel.results, parallel.end_time) != (reference.results, reference.end_time):
+        print('Parallel run DISAGREES with the reference simulation.')
+        sys.exit(1)
+    if sequential != parallel:
+        print('Parallel run DISAGREES with the sequential run.')
+        sys.exit(1)
+    print('Parallel run agrees with the reference simulation and the sequential run.')
@@ -0,0 +1,104 @@
+'''Binary columnar output of simulation results.
+
+Each column is stored in its own file in the NumPy .npy format (version 1.0,
+one-dimensional, little-endian), written without needing NumPy:
+
+    jobs.arrival.npy            <f8  arrival time
+    jobs.priority.npy           <i4  priority
+    jobs.processing_time.npy    <f8  processing time
+    jobs.start.npy              <f8  start of processing (departure - processing time)
+    processors.quantity.npy           <i8  number of jobs processed
+    processors.priority_quantity.npy  <i8  number of priority jobs processed
+    processors.free_time.npy          <f8  total idle time
+
+These are the columns of the text files 'jobs.dat' and 'processors.dat', in
+the same order. read_job_columns and read_processor_columns map the files in
+memory and return the columns as memoryviews without copying them;
+numpy.asarray(view) (or
+numpy.load(name, mmap_mode='r')) gives a NumPy array, also without copying.
+'''
+
+from array import array
+import ast
+import mmap
+import struct
+import sys
+
+MAGIC = b'\x93NUMPY'
+
+# array typecode and struct format of each supported .npy type.
+TYPES = {'<f8': ('d', 'd'), '<i4': ('i', 'i'), '<i8': ('q', 'q')}
+
+JOB_COLUMNS = (('arrival', '<f8'), ('priority', '<i4'), ('processing_time', '<f8'), ('start', '<f8'))
+PROCESSOR_COLUMNS = (('quantity', '<i8'), ('priority_quantity', '<i8'), ('free_time', '<f8'))
+
+
+def write_npy(filename, values, descr):
+    '''Write a sequence of numbers as a one-dimensional .npy file of the given
+    type ('<f8', '<i4' or '<i8'), in a single write of the data.'''
+    typecode = TYPES[descr][0]
+    if not isinstance(values, array) or values.typecode != typecode:
+        values = array(typecode, values)
+    if sys.byteorder == 'big':
+        values = array(typecode, values)
+        values.byteswap()
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, len(values))
+    # Pad so that the data starts at a multiple of 64 bytes.
+    header += ' '*(63 - (len(MAGIC) + 4 + len(header)) % 64) + '\n'
+    with open(filename, 'wb') as outfile:
+        outfile.write(MAGIC + b'\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1'))
+        outfile.write(values.tobytes())
+
+
+def read_npy(filename):
+    '''Map a one-dimensional .npy file written by write_npy in memory and
+    return its data as a memoryview of numbers (zero-copy on little-endian
+    machines).'''
+    with open(filename, 'rb') as infile:
+        data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('%s is not a .npy file.' % filename)
+    major = data[len(MAGIC)]
+    if major == 1:
+        header_length, = struct.unpack_from('<H', data, len(MAGIC) + 2)
+        start = len(MAGIC) + 4
+    else:
+        header_length, = struct.unpack_from('<I', data, len(MAGIC) + 2)
+        start = len(MAGIC) + 6
+    header = ast.literal_eval(data[start:start + header_length].decode('latin1'))
+    if header['descr'] not in TYPES or header['fortran_order'] or len(header['shape']) != 1:
+        raise ValueError('Unsupported .npy array in %s.' % filename)
+    typecode, fmt = TYPES[header['descr']]
+    offset = start + header_length
+    if sys.byteorder == 'big':
+        values = array(typecode, data[offset:])
+        values.byteswap()
+        return memoryview(values)
+    return memoryview(data)[offset:].cast(fmt)
+
+
+def write_job_columns(jobs, prefix='jobs'):
+    '''Write the columns of a JobTable as prefix.<column>.npy files.'''
+    arrival, priority, processing_time, departure = jobs.columns()
+    start = array('d', [d - t for d, t in zip(departure, processing_time)])
+    for (name, descr), values in zip(JOB_COLUMNS, (arrival, priority, processing_time, start)):
+        write_npy('%s.%s.npy' % (prefix, name), values, descr)
+
+
+def write_processor_columns(processors, prefix='processors'):
+    '''Write (quantity, priority quantity, total free time) tuples of the
+    processors as prefix.<column>.npy files.'''
+    columns = list(zip(*processors)) if processors else [(), (), ()]
+    for (name, descr), values in zip(PROCESSOR_COLUMNS, columns):
+        write_npy('%s.%s.npy' % (prefix, name), values, descr)
+
+
+def read_job_columns(prefix='jobs'):
+    '''Return a dict column name -> memoryview of the job files of prefix.'''
+    return {name: read_npy('%s.%s.npy' % (prefix, name)) for name, descr in JOB_COLUMNS}
+
+
+def read_processor_columns(prefix='processors'):
+    '''Return a dict column name -> memoryview of the processor files of
+    prefix.'''
+    return {name: read_npy('%s.%s.npy' % (prefix, name)) for name, descr in PROCESSOR_COLUMNS}
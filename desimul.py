@@ -1,25 +1,61 @@
 '''Implementation of basic classes for programming discrete event simulations.
 '''
 
+import heapq
+import itertools
 import queue
+import time
 from abc import ABC, abstractmethod
 
 
+# Global creation counter, used to break ties between events with equal time.
+_sequence = itertools.count()
+
+
+def next_sequence():
+    '''Return the creation number the next event will get (saved with the
+    state of a simulation).'''
+    global _sequence
+    value = next(_sequence)
+    _sequence = itertools.count(value)
+    return value
+
+
+def advance_sequence(value):
+    '''Make the next events get creation numbers of at least value, so that
+    they are ordered after the events of a restored simulation.'''
+    global _sequence
+    _sequence = itertools.count(max(value, next_sequence()))
+
+
 class Event(ABC):
 
     '''Base class of events. An event that occurs at a given time (a float
     value) and must be processed by a given server.
+
+    Events use __slots__, so subclasses should declare __slots__ with their
+    own attributes to stay compact. Events with the same time are processed
+    in creation order (FIFO).
     '''
 
+    __slots__ = ('_time', '_server', '_key', '_pending')
+
     def __init__(self, time, server):
         '''Create a new event for a given server at a given time.'''
         self._time = time
         self._server = server
+        self._key = (time, next(_sequence))
+        self._pending = False
 
     def time(self):
         '''Return event time.'''
         return self._time
 
+    def pending(self):
+        '''Return True if the event is in a calendar, neither processed nor
+        cancelled.'''
+        return self._pending
+
     def server(self):
         '''Return server associated with the event.'''
         return self._server
@@ -31,8 +67,71 @@ class Event(ABC):
 
     # Operator < is used to order events in the calendar
     def __lt__(self, other):
-        '''Order event by event time.'''
-        return self.time() < other.time()
+        '''Order event by event time, then by creation order.'''
+        return self._key < other._key
+
+
+class EventHandle:
+
+    '''Handle of a scheduled event, returned by Calendar.put. It remembers
+    the key the event had when it was scheduled, so it stays valid after the
+    event has been processed and its instance reused by an EventPool: the
+    handle then simply no longer refers to a pending event.
+    '''
+
+    __slots__ = ('_event', '_key')
+
+    def __init__(self, event):
+        '''Create the handle of a scheduled event.'''
+        self._event = event
+        self._key = event._key
+
+    def time(self):
+        '''Return the time the event was scheduled for.'''
+        return self._key[0]
+
+    def pending(self):
+        '''Return True if the event is still in its calendar, neither
+        processed nor cancelled.'''
+        event = self._event
+        return event._pending and event._key == self._key
+
+
+class EventPool:
+
+    '''Free list of processed events, kept per event class. Events obtained
+    from the pool are recycled instances re-initialized with new arguments,
+    which avoids allocating a new object for every event.
+
+    An event must not be referenced anymore after it has been released
+    (EventHandles of it stay safe to use).
+    '''
+
+    def __init__(self, capacity=1024):
+        '''Create an empty pool holding at most capacity events per class.'''
+        self._capacity = capacity
+        self._free = {}
+
+    def acquire(self, cls, *args):
+        '''Return an event of class cls initialized with args, reusing a
+        released instance when one is available.'''
+        free = self._free.get(cls)
+        if free:
+            event = free.pop()
+            event.__init__(*args)
+            return event
+        return cls(*args)
+
+    def release(self, event):
+        '''Give back an event that has already been processed.'''
+        free = self._free.setdefault(type(event), [])
+        if len(free) < self._capacity:
+            free.append(event)
+
+    def __getstate__(self):
+        '''Pickle the pool without its released events (they only save
+        allocations).'''
+        return {'_capacity': self._capacity, '_free': {}}
 
 
 class Server:
@@ -50,50 +149,357 @@ class Server:
         '''Return the calendar associated with this server'''
         return self._cal
 
+    def schedule(self, cls, *args):
+        '''Create an event of class cls with the given arguments (through the
+        calendar pool, if any), insert it in the calendar and return its
+        EventHandle (to cancel it).'''
+        cal = self._cal
+        return cal.put(cal.new_event(cls, *args))
+
+
+class EventQueue(ABC):
+
+    '''Base class of calendar backends. A backend stores events and always
+    removes the one with smallest scheduled time first.
+    '''
+
+    @abstractmethod
+    def put(self, event):
+        '''Insert a single event.'''
+        pass
+
+    def put_many(self, events):
+        '''Insert several events at once.'''
+        for event in events:
+            self.put(event)
+
+    @abstractmethod
+    def get(self):
+        '''Remove and return the event with smallest time.'''
+        pass
+
+    @abstractmethod
+    def peek(self):
+        '''Return the event with smallest time without removing it.'''
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        '''Return the number of stored events.'''
+        pass
+
+    def empty(self):
+        '''Return True if there are no stored events.'''
+        return len(self) == 0
+
+    def remove_cancelled(self):
+        '''Remove the events that are no longer pending (cancelled ones).'''
+        events = []
+        while not self.empty():
+            event = self.get()
+            if event._pending:
+                events.append(event)
+        self.put_many(events)
+
+
+class HeapEventQueue(EventQueue):
+
+    '''Calendar backend over a plain binary heap. It takes no locks, so it
+    must only be used from a single thread (the usual case in a simulation).
+    '''
+
+    def __init__(self):
+        '''Create an empty heap.'''
+        self._heap = []
+
+    def put(self, event):
+        '''Insert a single event in O(log n).'''
+        heapq.heappush(self._heap, event)
+
+    def put_many(self, events):
+        '''Insert a batch of events. When the batch is at least as large as
+        the heap, the whole heap is rebuilt in linear time.'''
+        heap = self._heap
+        events = list(events)
+        if len(events) >= len(heap):
+            heap.extend(events)
+            heapq.heapify(heap)
+        else:
+            for event in events:
+                heapq.heappush(heap, event)
+
+    def get(self):
+        '''Remove and return the event with smallest time.'''
+        return heapq.heappop(self._heap)
+
+    def peek(self):
+        '''Return the event with smallest time without removing it.'''
+        return self._heap[0]
+
+    def __len__(self):
+        '''Return the number of stored events.'''
+        return len(self._heap)
+
+    def remove_cancelled(self):
+        '''Remove the cancelled events and rebuild the heap in linear time.'''
+        heap = [event for event in self._heap if event._pending]
+        heapq.heapify(heap)
+        self._heap = heap
+
+
+class LockingEventQueue(EventQueue):
+
+    '''Thread-safe calendar backend built on queue.PriorityQueue. Only
+    useful if events are inserted from several threads.
+    '''
+
+    def __init__(self):
+        '''Create an empty priority queue.'''
+        self._queue = queue.PriorityQueue()
+
+    def put(self, event):
+        '''Insert a single event.'''
+        self._queue.put(event)
+
+    def get(self):
+        '''Remove and return the event with smallest time.'''
+        return self._queue.get()
+
+    def peek(self):
+        '''Return the event with smallest time without removing it.'''
+        with self._queue.mutex:
+            return self._queue.queue[0]
+
+    def __len__(self):
+        '''Return the number of stored events.'''
+        return self._queue.qsize()
+
+
+class CalendarProfile:
+
+    '''Statistics gathered by a Calendar while profiling is enabled: number
+    of processed events and time spent processing them per event class, the
+    largest number of scheduled events, and wall-clock versus simulated time.
+    '''
+
+    def __init__(self):
+        '''Create an empty profile.'''
+        self.counts = {}
+        self.process_times = {}
+        self.max_size = 0
+        self.wall_time = 0.0
+        self.simulated_time = 0.0
+
+    def events(self):
+        '''Return the total number of processed events.'''
+        return sum(self.counts.values())
+
+    def events_per_second(self):
+        '''Return processed events per second of wall-clock time.'''
+        if self.wall_time == 0:
+            return 0.0
+        return self.events()/self.wall_time
+
+    def time_ratio(self):
+        '''Return simulated time advanced per second of wall-clock time.'''
+        if self.wall_time == 0:
+            return 0.0
+        return self.simulated_time/self.wall_time
+
+    def summary(self):
+        '''Return a printable report of the profile.'''
+        lines = ['%-24s %12s %12s %12s' % ('event class', 'count', 'total (s)', 'mean (us)')]
+        for cls, count in sorted(self.counts.items(), key=lambda item: -self.process_times[item[0]]):
+            total = self.process_times[cls]
+            lines.append('%-24s %12d %12.6f %12.3f' % (cls.__name__, count, total, 1e6*total/count))
+        process_time = sum(self.process_times.values())
+        lines.append('events: %d in %.6f s (%.0f events/s)' % (self.events(), self.wall_time, self.events_per_second()))
+        lines.append('time in process(): %.6f s, calendar overhead: %.6f s' % (process_time, self.wall_time - process_time))
+        lines.append('calendar size high-water mark: %d' % self.max_size)
+        lines.append('simulated/wall-clock time ratio: %g' % self.time_ratio())
+        return '\n'.join(lines)
+
 
 class Calendar:
 
     '''Event calendar. The event to be removed is always the one with smallest
     scheduled time.
+
+    Scheduled events can be cancelled in O(1): cancel only marks the event,
+    which stays in the backend and is skipped when it reaches the front.
+    Once cancelled events outnumber the pending ones, they are removed from
+    the backend all at once, so they never dominate its size.
     '''
 
-    def __init__(self):
-        '''Creates a new empty calendar. Start time at 0.0.'''
-        self._queue = queue.PriorityQueue()
+    # Cancelled events tolerated in the backend before removing them.
+    MIN_COMPACTION = 64
+
+    def __init__(self, backend=None, pool=None):
+        '''Creates a new empty calendar. Start time at 0.0. The events are
+        stored in the given backend (an EventQueue), by default a
+        HeapEventQueue. If an EventPool is given, processed events are
+        released to it and new_event reuses them.'''
+        if backend is None:
+            backend = HeapEventQueue()
+        self._queue = backend
+        self._pool = pool
+        self._profile = None
         self._current_time = 0.0
+        # Number of cancelled events still stored in the backend.
+        self._cancelled = 0
 
     def current_time(self):
         '''Return the current time (time of last removed event).'''
         return self._current_time
 
-    def put(self, event):
-        '''Insert event in the calendar.'''
+    def __len__(self):
+        '''Return the number of scheduled (pending) events.'''
+        return len(self._queue) - self._cancelled
+
+    def enable_profiling(self):
+        '''Start recording a CalendarProfile of the processed events and
+        return it. Profiling is off by default and then costs nothing.'''
+        if self._profile is None:
+            self._profile = CalendarProfile()
+        return self._profile
+
+    def disable_profiling(self):
+        '''Stop profiling and return the recorded profile (or None).'''
+        profile = self._profile
+        self._profile = None
+        return profile
+
+    def profile(self):
+        '''Return the current CalendarProfile, or None if not profiling.'''
+        return self._profile
+
+    def _check(self, event):
+        '''Verify that event can be inserted in the calendar.'''
         if not isinstance(event, Event):
             raise TypeError('Argument to Calendar.put must be an Event.')
         if event.time() < self._current_time:
             raise ValueError('New event is previous to last removed event.')
+        if event._pending:
+            raise ValueError('Event is already scheduled.')
+
+    def new_event(self, cls, *args):
+        '''Create an event of class cls with the given arguments, taking it
+        from the event pool when the calendar has one.'''
+        if self._pool is None:
+            return cls(*args)
+        return self._pool.acquire(cls, *args)
+
+    def put(self, event):
+        '''Insert event in the calendar and return its EventHandle, to
+        cancel it.'''
+        self._check(event)
+        event._pending = True
         self._queue.put(event)
+        return EventHandle(event)
+
+    def put_many(self, events):
+        '''Insert all events of an iterable in the calendar.'''
+        events = list(events)
+        for event in events:
+            self._check(event)
+        for event in events:
+            event._pending = True
+        self._queue.put_many(events)
+
+    def cancel(self, handle):
+        '''Cancel the scheduled event of an EventHandle in O(1) (amortized).
+        Return True if it was pending, False if it had already been processed
+        or cancelled (even if its instance has been reused since).'''
+        event = handle._event
+        if not event._pending or event._key != handle._key:
+            return False
+        event._pending = False
+        self._cancelled += 1
+        if self._cancelled > self.MIN_COMPACTION and 2*self._cancelled > len(self._queue):
+            self._queue.remove_cancelled()
+            self._cancelled = 0
+        return True
+
+    def _skip_cancelled(self):
+        '''Remove the cancelled events at the front of the backend.'''
+        events = self._queue
+        while self._cancelled and not events.empty() and not events.peek()._pending:
+            events.get()
+            self._cancelled -= 1
+
+    def peek(self):
+        '''Return next event without removing it, or None if the calendar is
+        empty.'''
+        self._skip_cancelled()
+        if self._queue.empty():
+            return None
+        return self._queue.peek()
 
     def get(self):
         '''Get next event and remove it from calendar.'''
         event = self._queue.get()
+        while not event._pending:
+            self._cancelled -= 1
+            event = self._queue.get()
+        event._pending = False
         self._current_time = event.time()
         return event
 
     def process_all_events(self):
         '''Keep processing events until eventually the calendar is empty.'''
-        while not self._queue.empty():
+        if self._profile is not None:
+            return self._process_profiled(None)
+        events = self._queue
+        pool = self._pool
+        while len(events) > self._cancelled:
             ev = self.get()
             ev.process()
+            if pool is not None:
+                pool.release(ev)
 
     def process_events_until(self, timeout):
         '''Process events until the next event has timestamp larger than the
         specified timeout.'''
-        while not self._queue.empty():
-            event = self._queue.get()
-            if event.time() <= timeout:
-                self._current_time = event.time()
-                event.process()
-            else:  # Next event is after timeout
-                self._queue.put(event)  # Put it back (not yet processed)
+        if self._profile is not None:
+            return self._process_profiled(timeout)
+        pool = self._pool
+        while True:
+            ev = self.peek()
+            if ev is None or ev.time() > timeout:
+                break  # Next event is after timeout, leave it in place
+            ev = self.get()
+            ev.process()
+            if pool is not None:
+                pool.release(ev)
+
+    def _process_profiled(self, timeout):
+        '''Process events as process_events_until (or process_all_events if
+        timeout is None), updating the profile.'''
+        profile = self._profile
+        counts = profile.counts
+        process_times = profile.process_times
+        clock = time.perf_counter
+        events = self._queue
+        pool = self._pool
+        max_size = max(profile.max_size, len(self))
+        start_time = self._current_time
+        start_clock = clock()
+        while True:
+            ev = self.peek()
+            if ev is None or (timeout is not None and ev.time() > timeout):
                 break
+            ev = self.get()
+            before = clock()
+            ev.process()
+            elapsed = clock() - before
+            cls = type(ev)
+            counts[cls] = counts.get(cls, 0) + 1
+            process_times[cls] = process_times.get(cls, 0.0) + elapsed
+            size = len(events) - self._cancelled
+            if size > max_size:
+                max_size = size
+            if pool is not None:
+                pool.release(ev)
+        profile.wall_time += clock() - start_clock
+        profile.simulated_time += self._current_time - start_time
+        profile.max_size = max_size
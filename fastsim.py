@@ -0,0 +1,171 @@
+'''Event-free simulation kernel for the jobs/processors model of Trabalho3_POO.
+
+The kernel simulates the same model as Trabalho3_POO.simple_simulation (a
+queueing system with a priority and a normal FIFO queue served by identical
+processors) without Event objects: busy processors are kept in a min-heap of
+free times, the next arrival in local variables and the jobs just sent to a
+processor in a FIFO. Simultaneous events are ordered by the same creation
+sequence the calendar uses, so the results are identical to the event-driven
+reference implementation, which remains the specification of the model.
+'''
+
+from collections import deque, namedtuple
+import heapq
+import random
+import sys
+
+from columnar import write_job_columns, write_processor_columns
+from Trabalho3_POO import (JobTable, Processor_par, make_job_parameters,
+                           simple_simulation)
+
+FastResult = namedtuple('FastResult', ['jobs', 'processors', 'end_time'])
+
+
+def fast_simulation(processors_p, jobs_p, save=True, keep_jobs=False, binary=False):
+    '''Perform the simulation for the given processor and job parameters.
+    Save the results in files 'processors.dat' and 'jobs.dat' (unless save is
+    False), in the same format as simple_simulation (or in the binary
+    columnar format if binary is set).
+
+    Return a FastResult with the JobTable of the jobs (None unless save or
+    keep_jobs is set), the list of (quantity, priority quantity, total free
+    time) tuples of the processors and the final simulation time.'''
+
+    p = processors_p.number
+    quantity = [0]*p
+    priority_quantity = [0]*p
+    free_time = [0.0]*p
+    last_attending = [0.0]*p
+
+    keep = save or keep_jobs
+    table = JobTable(jobs_p.number) if keep else None
+
+    # Pending "processor free" events: (time, sequence, processor).
+    frees = [(0.0, i, i) for i in range(p)]
+    seq = p
+    free_processors = deque()
+    queue_normal = deque()
+    queue_priority = deque()
+    # Jobs sent to a processor at the current time: (sequence, processor, job).
+    dispatch = deque()
+
+    times, priorities, arrivals = jobs_p.time, jobs_p.priority, jobs_p.arrival
+    remaining = jobs_p.number
+    now = 0.0
+
+    # Next arrival (jobs are (processing time, priority, record index)).
+    if remaining:
+        job = (next(times), next(priorities), 0)
+        arrival_time = next(arrivals)
+        arrival_seq = seq
+        seq += 1
+        remaining -= 1
+    else:
+        arrival_time = None
+
+    while True:
+        if dispatch:
+            dispatch_seq = dispatch[0][0]
+            if not ((frees and frees[0][0] == now and frees[0][1] < dispatch_seq)
+                    or (arrival_time == now and arrival_seq < dispatch_seq)):
+                # Processor starts the job.
+                _, i, (processing_time, priority, index) = dispatch.popleft()
+                free_time[i] += now - last_attending[i]
+                finish_time = now + processing_time
+                if finish_time < now:
+                    raise ValueError('New event is previous to last removed event.')
+                if keep:
+                    table.set_departure(index, finish_time)
+                heapq.heappush(frees, (finish_time, seq, i))
+                seq += 1
+                last_attending[i] = finish_time
+                quantity[i] += 1
+                if priority == 1:
+                    priority_quantity[i] += 1
+                continue
+
+        if arrival_time is not None and (not frees or (arrival_time, arrival_seq) < frees[0][:2]):
+            # A job arrives.
+            if arrival_time < now:
+                raise ValueError('New event is previous to last removed event.')
+            now = arrival_time
+            if keep:
+                table.set_arrival(table.add(job[0], job[1]), now)
+            if free_processors:
+                dispatch.append((seq, free_processors.popleft(), job))
+                seq += 1
+            elif job[1] == 1:
+                queue_priority.append(job)
+            elif job[1] == 0:
+                queue_normal.append(job)
+            else:
+                raise ValueError('The fast kernel only supports priorities 0 and 1.')
+            if remaining:
+                job = (next(times), next(priorities), job[2] + 1)
+                arrival_time = next(arrivals)
+                arrival_seq = seq
+                seq += 1
+                remaining -= 1
+            else:
+                arrival_time = None
+        elif frees:
+            # A processor becomes free.
+            now, _, i = heapq.heappop(frees)
+            if queue_priority:
+                dispatch.append((seq, i, queue_priority.popleft()))
+                seq += 1
+            elif queue_normal:
+                dispatch.append((seq, i, queue_normal.popleft()))
+                seq += 1
+            else:
+                free_processors.append(i)
+        elif not dispatch:
+            break
+
+    processors = list(zip(quantity, priority_quantity, free_time))
+    if save:
+        if binary:
+            write_job_columns(table)
+            write_processor_columns(processors)
+        else:
+            table.write('jobs.dat')
+            with open('processors.dat', 'w') as outfile:
+                for processor in processors:
+                    print(*processor, file=outfile)
+        print('Total simulation time for this test is', now)
+    return FastResult(table, processors, now)
+
+
+def check_agreement(processors_p, make_jobs_p):
+    '''Run both the event-driven reference and the fast kernel on the same
+    inputs and return True if their per-job and per-processor results are
+    identical. make_jobs_p is called once for each run and must return the
+    same job parameters every time (e.g. from a freshly seeded generator).'''
+    reference = simple_simulation(processors_p, make_jobs_p(), save=False, keep_jobs=True)
+    fast = fast_simulation(processors_p, make_jobs_p(), save=False, keep_jobs=True)
+
+    processors = [(processor.quantity, processor.priority_quantity, processor.total_free_time())
+                  for processor in reference.processors]
+    return (reference.jobs.columns() == fast.jobs.columns() and processors == fast.processors
+            and reference.end_time == fast.end_time)
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    # Same parameters as Trabalho3_POO, then optionally a seed. Checks that
+    # the fast kernel agrees with the reference implementation.
+    p, tau, sigma, T, m, alpha = sys.argv[1:7]
+    p, tau, sigma, T, m, alpha = int(p), float(tau), float(sigma), float(T), int(m), int(alpha)
+    seed = int(sys.argv[7]) if len(sys.argv) > 7 else 0
+
+    def make_jobs_p():
+        '''Job parameters drawn from a generator with the fixed seed.'''
+        return make_job_parameters(tau, sigma, T, m, alpha, random.Random(seed))
+
+    if check_agreement(Processor_par(p), make_jobs_p):
+        print('Fast kernel agrees with the reference simulation.')
+    else:
+        print('Fast kernel DISAGREES with the reference simulation.')
+        sys.exit(1)
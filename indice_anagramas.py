@@ -0,0 +1,168 @@
+'''Índice binário persistente de anagramas, lido por mapeamento em memória (mmap).
+
+Formato do arquivo (inteiros de 8 bytes sem sinal, little-endian):
+	- cabeçalho: a assinatura b'ANAGRAM1', o número n de grupos, a posição do bloco de chaves e a posição do bloco de palavras;
+	- tabela de n + 1 posições das chaves dentro do bloco de chaves;
+	- tabela de n + 1 posições dos grupos dentro do bloco de palavras;
+	- bloco de chaves: as chaves (letras em ordem, UTF-8) em ordem crescente de bytes, concatenadas;
+	- bloco de palavras: as palavras de cada grupo, em ordem alfanumérica, separadas por \\n.
+
+Abrir o índice não lê nem interpreta o arquivo: a busca das chaves é binária, direto no mapeamento.
+Palavras novas são acrescentadas a um arquivo delta (nome do índice + '.delta', uma palavra por linha), sem reconstruir o índice.
+'''
+
+import mmap
+import os
+import struct
+import sys
+
+from Trabalho1_POO import agrupa, chave
+
+ASSINATURA = b'ANAGRAM1'
+CABECALHO = struct.Struct('<8sQQQ')
+POSICAO = struct.Struct('<Q')
+
+def grava_indice(conjunto_anagrama, nome):
+	'''Grava o índice dos grupos de anagramas (dicionário chave -> palavras, como o de agrupa) no arquivo nome.'''
+	chaves = sorted((s.encode('utf-8'), s) for s in conjunto_anagrama)
+	n = len(chaves)
+	inicio_tabelas = CABECALHO.size
+	inicio_chaves = inicio_tabelas + 2*(n + 1)*POSICAO.size
+	tamanho_chaves = sum(len(codificada) for codificada, s in chaves)
+	with open(nome, 'wb') as arquivo:
+		arquivo.write(CABECALHO.pack(ASSINATURA, n, inicio_chaves, inicio_chaves + tamanho_chaves))
+		posicao = 0
+		for codificada, s in chaves:
+			arquivo.write(POSICAO.pack(posicao))
+			posicao += len(codificada)
+		arquivo.write(POSICAO.pack(posicao))
+		#os grupos são codificados duas vezes (aqui e abaixo) para não guardar todos na memória.
+		posicao = 0
+		for codificada, s in chaves:
+			arquivo.write(POSICAO.pack(posicao))
+			posicao += len('\n'.join(sorted(conjunto_anagrama[s])).encode('utf-8'))
+		arquivo.write(POSICAO.pack(posicao))
+		for codificada, s in chaves:
+			arquivo.write(codificada)
+		for codificada, s in chaves:
+			arquivo.write('\n'.join(sorted(conjunto_anagrama[s])).encode('utf-8'))
+
+class IndiceAnagramas:
+	'''Índice de anagramas mapeado em memória, com as palavras acrescentadas depois no arquivo delta.'''
+
+	def __init__(self, nome):
+		'''Abre o índice do arquivo nome e carrega seu delta, se existir.'''
+		self._nome = nome
+		with open(nome, 'rb') as arquivo:
+			self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+		assinatura, self._n, self._inicio_chaves, self._inicio_palavras = CABECALHO.unpack_from(self._mapa, 0)
+		if assinatura != ASSINATURA:
+			self._mapa.close()
+			raise ValueError('%s não é um índice de anagramas.' % nome)
+		self._tabela_grupos = CABECALHO.size + (self._n + 1)*POSICAO.size
+		self._delta = {}
+		if os.path.exists(self.nome_delta()):
+			with open(self.nome_delta(), encoding='utf-8') as delta:
+				agrupa(delta, self._delta)
+
+	def nome_delta(self):
+		'''Retorna o nome do arquivo delta do índice.'''
+		return self._nome + '.delta'
+
+	def __len__(self):
+		'''Número de grupos do índice (sem contar o delta).'''
+		return self._n
+
+	def __enter__(self):
+		'''Permite usar o índice em um bloco with.'''
+		return self
+
+	def __exit__(self, *excecao):
+		'''Fecha o índice ao sair do bloco with.'''
+		self.fecha()
+
+	def fecha(self):
+		'''Fecha o mapeamento do arquivo.'''
+		self._mapa.close()
+
+	def _chave(self, i):
+		'''Retorna os bytes da i-ésima chave.'''
+		inicio, fim = struct.unpack_from('<QQ', self._mapa, CABECALHO.size + i*POSICAO.size)
+		return self._mapa[self._inicio_chaves + inicio:self._inicio_chaves + fim]
+
+	def _grupo(self, i):
+		'''Retorna a lista de palavras do i-ésimo grupo.'''
+		inicio, fim = struct.unpack_from('<QQ', self._mapa, self._tabela_grupos + i*POSICAO.size)
+		return self._mapa[self._inicio_palavras + inicio:self._inicio_palavras + fim].decode('utf-8').split('\n')
+
+	def _busca(self, codificada):
+		'''Busca binária da chave; retorna seu índice ou None.'''
+		baixo, alto = 0, self._n
+		while baixo < alto:
+			meio = (baixo + alto)//2
+			if self._chave(meio) < codificada:
+				baixo = meio + 1
+			else:
+				alto = meio
+		if baixo < self._n and self._chave(baixo) == codificada:
+			return baixo
+		return None
+
+	def anagramas(self, palavra):
+		'''Retorna, em ordem alfanumérica, todas as palavras do índice e do delta que são anagramas da palavra dada.'''
+		s = chave(palavra.strip().lower())
+		i = self._busca(s.encode('utf-8'))
+		palavras = self._grupo(i) if i is not None else []
+		if s in self._delta:
+			palavras = sorted(palavras + self._delta[s])
+		return palavras
+
+	def acrescenta(self, palavras):
+		'''Acrescenta palavras ao delta do índice (no arquivo e na memória).'''
+		palavras = [palavra.strip().lower() for palavra in palavras]
+		with open(self.nome_delta(), 'a', encoding='utf-8') as delta:
+			delta.write(''.join(palavra + '\n' for palavra in palavras))
+		agrupa(palavras, self._delta)
+
+	def grupos(self):
+		'''Gera os pares (chave, palavras) do índice e do delta, em ordem de chave.'''
+		delta = sorted((s.encode('utf-8'), s) for s in self._delta)
+		j = 0
+		for i in range(self._n):
+			codificada = self._chave(i)
+			while j < len(delta) and delta[j][0] < codificada:
+				yield delta[j][1], sorted(self._delta[delta[j][1]])
+				j += 1
+			s = codificada.decode('utf-8')
+			palavras = self._grupo(i)
+			if j < len(delta) and delta[j][0] == codificada:
+				palavras = sorted(palavras + self._delta[s])
+				j += 1
+			yield s, palavras
+		for codificada, s in delta[j:]:
+			yield s, sorted(self._delta[s])
+
+def compacta(nome):
+	'''Reconstrói o índice incorporando o delta, que é apagado.'''
+	with IndiceAnagramas(nome) as indice:
+		conjunto_anagrama = dict(indice.grupos())
+		delta = indice.nome_delta()
+	grava_indice(conjunto_anagrama, nome + '.novo')
+	os.replace(nome + '.novo', nome)
+	if os.path.exists(delta):
+		os.remove(delta)
+
+if __name__ == '__main__':
+	#uso: python indice_anagramas.py indice palavra...       (consulta)
+	#     python indice_anagramas.py indice --acrescenta arquivo
+	#     python indice_anagramas.py indice --compacta
+	nome = sys.argv[1]
+	if sys.argv[2:3] == ['--compacta']:
+		compacta(nome)
+	elif sys.argv[2:3] == ['--acrescenta']:
+		with IndiceAnagramas(nome) as indice, open(sys.argv[3], encoding='utf-8') as novas:
+			indice.acrescenta(novas)
+	else:
+		with IndiceAnagramas(nome) as indice:
+			for palavra in sys.argv[2:]:
+				print(palavra + ':', ', '.join(indice.anagramas(palavra)))
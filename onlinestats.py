@@ -0,0 +1,218 @@
+'''Online (streaming) statistics for simulations. Values are folded into the
+estimators as they are produced, so memory does not grow with the number of
+observations.
+'''
+
+
+class RunningStats:
+
+    '''Running count, mean, variance (Welford's method), minimum and maximum
+    of a stream of values.
+    '''
+
+    __slots__ = ('n', 'mean', '_m2', 'min', 'max')
+
+    def __init__(self):
+        '''Create an estimator with no observations.'''
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, x):
+        '''Include a new value.'''
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta/self.n
+        self._m2 += delta*(x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        '''Include all the values seen by another RunningStats.'''
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta*delta*self.n*other.n/n
+        self.mean += delta*other.n/n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self):
+        '''Return the sample variance (0.0 with less than two values).'''
+        if self.n < 2:
+            return 0.0
+        return self._m2/(self.n - 1)
+
+    def stdev(self):
+        '''Return the sample standard deviation.'''
+        return self.variance()**0.5
+
+
+class P2Quantile:
+
+    '''Streaming estimate of the p-quantile of a stream of values, using the
+    P-square algorithm of Jain and Chlamtac (five markers, constant memory).
+    '''
+
+    __slots__ = ('p', '_q', '_n', '_np', '_dn')
+
+    def __init__(self, p):
+        '''Create an estimator of the p-quantile, 0 < p < 1.'''
+        if not 0 < p < 1:
+            raise ValueError('Quantile must be between 0 and 1.')
+        self.p = p
+        self._q = []  # Marker heights
+        self._n = [1, 2, 3, 4, 5]  # Marker positions
+        self._np = [1, 1 + 2*p, 1 + 4*p, 3 + 2*p, 5]  # Desired positions
+        self._dn = [0, p/2, p, (1 + p)/2, 1]  # Desired position increments
+
+    def add(self, x):
+        '''Include a new value.'''
+        q = self._q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        n = self._n
+
+        # Find the cell of x, adjusting the extreme markers if needed.
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        np = self._np
+        dn = self._dn
+        for i in range(5):
+            np[i] += dn[i]
+
+        # Move the middle markers towards their desired positions.
+        for i in range(1, 4):
+            d = np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qi = q[i] + d/(n[i + 1] - n[i - 1])*(
+                    (n[i] - n[i - 1] + d)*(q[i + 1] - q[i])/(n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d)*(q[i] - q[i - 1])/(n[i] - n[i - 1]))
+                if not q[i - 1] < qi < q[i + 1]:
+                    # Parabolic prediction out of order, use linear one.
+                    qi = q[i] + d*(q[i + d] - q[i])/(n[i + d] - n[i])
+                q[i] = qi
+                n[i] += d
+
+    def value(self):
+        '''Return the current estimate (exact with five values or less).'''
+        q = self._q
+        if not q:
+            return float('nan')
+        if len(q) < 5 or self._n[4] == 5:
+            return q[min(len(q) - 1, int(self.p*len(q)))]
+        return q[2]
+
+
+class SimulationStatistics:
+
+    '''Collects the statistics of a jobs/processors simulation as jobs are
+    served: waiting and response times (running moments and quantiles) per
+    priority class, and busy/idle time of each processor.
+    '''
+
+    def __init__(self, quantiles=(0.5, 0.9, 0.99)):
+        '''Create an empty collector estimating the given waiting time
+        quantiles for each priority class.'''
+        self._quantiles = quantiles
+        self._wait = {}
+        self._wait_quantiles = {}
+        self._response = RunningStats()
+        self._processors = {}
+
+    def add_processor(self, processor):
+        '''Register a processor, so that it counts in the utilization even if
+        it never serves a job (called when the processor is created).'''
+        self._processor(processor)
+
+    def _processor(self, processor):
+        '''Return the [jobs, busy, idle] record of a processor.'''
+        record = self._processors.get(processor)
+        if record is None:
+            record = self._processors[processor] = [0, 0.0, 0.0]
+        return record
+
+    def job_served(self, processor, job, arrival, start, finish):
+        '''Record a job that arrived, started and finished at the given times
+        on the given processor.'''
+        priority = job.priority()
+        wait = self._wait.get(priority)
+        if wait is None:
+            wait = self._wait[priority] = RunningStats()
+            self._wait_quantiles[priority] = [P2Quantile(p) for p in self._quantiles]
+        waiting_time = start - arrival
+        wait.add(waiting_time)
+        for estimator in self._wait_quantiles[priority]:
+            estimator.add(waiting_time)
+        self._response.add(finish - arrival)
+        record = self._processor(processor)
+        record[0] += 1
+        record[1] += finish - start
+
+    def idle(self, processor, length):
+        '''Record an idle period of a processor.'''
+        self._processor(processor)[2] += length
+
+    def waiting(self, priority=None):
+        '''Return the RunningStats of waiting times of a priority class, or of
+        all jobs if priority is None.'''
+        if priority is not None:
+            return self._wait.get(priority, RunningStats())
+        total = RunningStats()
+        for stats in self._wait.values():
+            total.merge(stats)
+        return total
+
+    def waiting_quantiles(self, priority):
+        '''Return a dict quantile -> estimated waiting time of a class.'''
+        return {estimator.p: estimator.value()
+                for estimator in self._wait_quantiles.get(priority, [])}
+
+    def response(self):
+        '''Return the RunningStats of response (arrival to departure) times.'''
+        return self._response
+
+    def utilization(self, end_time):
+        '''Return the list of busy time fractions of each processor (in order
+        of registration) up to end_time.'''
+        if end_time <= 0:
+            return [0.0]*len(self._processors)
+        return [busy/end_time for _, busy, _ in self._processors.values()]
+
+    def summary(self, end_time):
+        '''Return a dict of scalar statistics of the run.'''
+        wait = self.waiting()
+        utilization = self.utilization(end_time)
+        stats = {
+            'mean_wait': wait.mean,
+            'stdev_wait': wait.stdev(),
+            'max_wait': wait.max if wait.n else 0.0,
+            'mean_response': self._response.mean,
+            'utilization': sum(utilization)/len(utilization) if utilization else 0.0,
+            'throughput': self._response.n/end_time if end_time > 0 else 0.0,
+            'end_time': end_time,
+        }
+        for priority in sorted(self._wait):
+            stats['mean_wait_%d' % priority] = self._wait[priority].mean
+            for p, value in self.waiting_quantiles(priority).items():
+                stats['q%g_wait_%d' % (100*p, priority)] = value
+        return stats
@@ -0,0 +1,286 @@
+'''Conservative parallel execution of desimul models across processes.
+
+A model is split into logical processes (LPs). Each LP has its own Calendar
+and servers, and may run in a separate OS process. Servers in different LPs
+interact only through remote events, sent with LogicalProcess.send to a
+server registered by name in the target LP. A remote event must be scheduled
+at least lookahead time units after the current time of its sender.
+
+Synchronization uses time windows. In each window every LP processes its
+events with time in [start, start + lookahead), where start is the smallest
+pending event time over all LPs (including remote events in transit). No
+event processed in the window can be affected by a remote event sent during
+it, since those are at least lookahead later. At the end of the window the
+remote events are exchanged and inserted in their target calendars sorted by
+(time, source LP, send order). The run is therefore deterministic: given the
+model and its partition, run_sequential (all LPs in this process) and
+run_parallel (one process per LP) give identical results. run_reference runs
+the same model as a plain desimul simulation, with no windows, to check the
+synchronization itself.
+
+A model is a picklable function model(lp) that creates the servers of lp on
+lp.calendar(), registers those that receive remote events, schedules the
+initial events and returns a function returning the (picklable) result of
+the LP once the simulation is over.
+'''
+
+from collections import namedtuple
+import math
+import multiprocessing
+import traceback
+
+from desimul import Calendar, EventPool
+
+ParallelResult = namedtuple('ParallelResult', ['results', 'end_time', 'windows'])
+
+
+class LogicalProcess:
+
+    '''A partition of the model: a calendar, its servers and the remote
+    events they send.'''
+
+    def __init__(self, index, partitions, lookahead):
+        '''Create LP number index out of partitions, with the given lookahead
+        (a positive time).'''
+        if lookahead <= 0:
+            raise ValueError('The lookahead must be positive.')
+        self._index = index
+        self._partitions = partitions
+        self._lookahead = lookahead
+        self._calendar = Calendar(pool=EventPool())
+        self._servers = {}
+        self._outbox = []
+        self._sent = 0
+
+    def index(self):
+        '''Return the number of this LP.'''
+        return self._index
+
+    def partitions(self):
+        '''Return the total number of LPs.'''
+        return self._partitions
+
+    def lookahead(self):
+        '''Return the minimum delay of remote events.'''
+        return self._lookahead
+
+    def calendar(self):
+        '''Return the calendar of this LP.'''
+        return self._calendar
+
+    def register(self, name, server):
+        '''Make server the target of remote events sent to name.'''
+        self._servers[name] = server
+
+    def _check_send(self, target, time):
+        '''Verify that a remote event can be sent to LP target at time.'''
+        if not 0 <= target < self._partitions:
+            raise ValueError('There is no logical process %d.' % target)
+        if time < self._calendar.current_time() + self._lookahead:
+            raise ValueError('Remote event is closer than the lookahead.')
+
+    def send(self, target, name, time, cls, *args):
+        '''Schedule cls(time, server, *args) in LP target, where server is
+        registered there as name. The event class and arguments must be
+        picklable.'''
+        self._check_send(target, time)
+        self._outbox.append((time, self._index, self._sent, target, name, cls, args))
+        self._sent += 1
+
+    def next_time(self):
+        '''Return the time of the next local event (infinity if none).'''
+        event = self._calendar.peek()
+        return math.inf if event is None else event.time()
+
+    def window(self, end, messages):
+        '''Insert the remote events received, process the local events before
+        end and return the remote events sent and the next local time.'''
+        calendar = self._calendar
+        for time, source, sent, target, name, cls, args in sorted(messages):
+            calendar.put(calendar.new_event(cls, time, self._servers[name], *args))
+        calendar.process_events_until(math.nextafter(end, -math.inf))
+        outbox = self._outbox
+        self._outbox = []
+        return outbox, self.next_time()
+
+
+class _SharedLP(LogicalProcess):
+
+    '''Logical process of run_reference: all LPs share one calendar, and
+    remote events are inserted in it as soon as they are sent.'''
+
+    def __init__(self, index, partitions, lookahead, calendar, lps):
+        '''Create LP number index on the shared calendar; lps is the list of
+        all LPs (the targets of remote events).'''
+        LogicalProcess.__init__(self, index, partitions, lookahead)
+        self._calendar = calendar
+        self._lps = lps
+        self._direct = False
+
+    def send(self, target, name, time, cls, *args):
+        '''Schedule a remote event directly in the shared calendar (once all
+        LPs are built; before that it is kept, as in LogicalProcess).'''
+        if not self._direct:
+            return LogicalProcess.send(self, target, name, time, cls, *args)
+        self._check_send(target, time)
+        calendar = self._calendar
+        calendar.put(calendar.new_event(cls, time, self._lps[target]._servers[name], *args))
+
+    def start(self):
+        '''Deliver the remote events sent while the LPs were being built and
+        insert the next ones directly.'''
+        self._direct = True
+        outbox = self._outbox
+        self._outbox = []
+        return outbox
+
+
+# Execution of the logical processes
+
+class _LocalLP:
+
+    '''Logical process run in this process.'''
+
+    def __init__(self, model, index, partitions, lookahead):
+        '''Build the LP.'''
+        self._lp = LogicalProcess(index, partitions, lookahead)
+        self._collect = model(self._lp)
+        self._reply = self._lp.next_time()
+
+    def request(self, end, messages):
+        '''Run a window.'''
+        self._reply = self._lp.window(end, messages)
+
+    def reply(self):
+        '''Return the result of the last request.'''
+        return self._reply
+
+    def finish(self):
+        '''Return the result of the LP and its final time.'''
+        return self._collect(), self._lp.calendar().current_time()
+
+
+def _serve(connection, model, index, partitions, lookahead):
+    '''Body of the process of a remote LP: answer window requests (None to
+    finish) until the end of the simulation.'''
+    try:
+        lp = LogicalProcess(index, partitions, lookahead)
+        collect = model(lp)
+        connection.send((True, lp.next_time()))
+        for request in iter(connection.recv, None):
+            connection.send((True, lp.window(*request)))
+        connection.send((True, (collect(), lp.calendar().current_time())))
+    except Exception:
+        connection.send((False, traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+class _RemoteLP:
+
+    '''Logical process run in another process, connected by a pipe.'''
+
+    def __init__(self, context, model, index, partitions, lookahead):
+        '''Start the process of the LP.'''
+        self._connection, child = context.Pipe()
+        self._process = context.Process(target=_serve, args=(child, model, index, partitions, lookahead),
+                                        daemon=True)
+        self._process.start()
+        child.close()
+
+    def request(self, end, messages):
+        '''Ask for a window to be run.'''
+        self._connection.send((end, messages))
+
+    def reply(self):
+        '''Wait for the result of the last request.'''
+        ok, value = self._connection.recv()
+        if not ok:
+            raise RuntimeError('Logical process failed:\n' + value)
+        return value
+
+    def finish(self):
+        '''Return the result of the LP and its final time.'''
+        self._connection.send(None)
+        try:
+            return self.reply()
+        finally:
+            self._process.join()
+            self._connection.close()
+
+    def terminate(self):
+        '''Stop the process of the LP after a failure.'''
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+
+
+def _coordinate(lps, lookahead, until):
+    '''Run the time windows of the LPs up to time until (None for no limit)
+    and return a ParallelResult.'''
+    next_times = [lp.reply() for lp in lps]
+    inboxes = [[] for lp in lps]
+    windows = 0
+    while True:
+        start = min(min([next_times[i]] + [message[0] for message in inbox])
+                    for i, inbox in enumerate(inboxes))
+        if start == math.inf or (until is not None and start > until):
+            break
+        end = start + lookahead
+        if until is not None:
+            end = min(end, math.nextafter(until, math.inf))
+        for lp, inbox in zip(lps, inboxes):
+            lp.request(end, inbox)
+        inboxes = [[] for lp in lps]
+        for i, lp in enumerate(lps):
+            outbox, next_times[i] = lp.reply()
+            for message in outbox:
+                inboxes[message[3]].append(message)
+        windows += 1
+    results, times = zip(*[lp.finish() for lp in lps])
+    return ParallelResult(list(results), max(times), windows)
+
+
+def run_sequential(model, partitions, lookahead, until=None):
+    '''Run all LPs of the model in this process, with the same windows as
+    run_parallel, and return a ParallelResult.'''
+    lps = [_LocalLP(model, i, partitions, lookahead) for i in range(partitions)]
+    return _coordinate(lps, lookahead, until)
+
+
+def run_reference(model, partitions, lookahead, until=None):
+    '''Run the model as a plain desimul simulation, without time windows:
+    all LPs share one calendar and remote events go straight into it. Return
+    a ParallelResult with windows set to None. Its results and end time are
+    those of run_sequential and run_parallel unless remote and local events
+    have exactly the same time (their order may then differ), so it is the
+    reference to check the windowed synchronization against.'''
+    calendar = Calendar(pool=EventPool())
+    lps = []
+    for i in range(partitions):
+        lps.append(_SharedLP(i, partitions, lookahead, calendar, lps))
+    collects = [model(lp) for lp in lps]
+    for time, source, sent, target, name, cls, args in sorted(message for lp in lps for message in lp.start()):
+        calendar.put(calendar.new_event(cls, time, lps[target]._servers[name], *args))
+    if until is None:
+        calendar.process_all_events()
+    else:
+        calendar.process_events_until(until)
+    return ParallelResult([collect() for collect in collects], calendar.current_time(), None)
+
+
+def run_parallel(model, partitions, lookahead, until=None, context=None):
+    '''Run each LP of the model in its own process (from the given
+    multiprocessing context) and return a ParallelResult, identical to the
+    one of run_sequential.'''
+    if context is None:
+        context = multiprocessing.get_context()
+    lps = []
+    try:
+        for i in range(partitions):
+            lps.append(_RemoteLP(context, model, i, partitions, lookahead))
+        return _coordinate(lps, lookahead, until)
+    except BaseException:
+        for lp in lps:
+            lp.terminate()
+        raise
@@ -2,7 +2,11 @@ import cmath
 import math
 
 class Quaternion:
-	'''Classe em que são definidas as operações entre quaternions e entre quaternions e números reais e complexos.'''
+	'''Classe em que são definidas as operações entre quaternions e entre quaternions e números reais e complexos.
+	Todas as operações retornam um novo Quaternion, exceto os operadores +=, -=, *= e /=, que alteram o próprio objeto.'''
+
+	#__slots__ evita o dicionário de atributos em cada objeto.
+	__slots__ = ('_a1', '_a2', '_a3', '_a4')
     
 	def __init__(self, a1, a2, a3, a4):
 		'''Inicializa o número quaterniônico.'''
@@ -10,108 +14,173 @@ class Quaternion:
 		self._a2 = a2
 		self._a3 = a3
 		self._a4 = a4
+
+	def __repr__(self):
+		'''Representação do quaternion como texto.'''
+		return 'Quaternion(%r, %r, %r, %r)' % (self._a1, self._a2, self._a3, self._a4)
+
+	def __iter__(self):
+		'''Permite desempacotar o quaternion como a tupla (a1, a2, a3, a4).'''
+		return iter((self._a1, self._a2, self._a3, self._a4))
+
+	def __getitem__(self, index):
+		'''Permite acessar os coeficientes por índice, como em uma tupla.'''
+		return (self._a1, self._a2, self._a3, self._a4)[index]
+
+	def __len__(self):
+		'''Número de coeficientes do quaternion.'''
+		return 4
+
+	def __eq__(self, other):
+		'''Compara os coeficientes com os de outro quaternion ou de uma sequência de 4 números (como a tupla (a1, a2, a3, a4)).'''
+		if type(other) is Quaternion:
+			return (self._a1, self._a2, self._a3, self._a4) == (other._a1, other._a2, other._a3, other._a4)
+		if isinstance(other, (tuple, list)):
+			return len(other) == 4 and (self._a1, self._a2, self._a3, self._a4) == tuple(other)
+		return NotImplemented
+
+	#Quaternions podem ser alterados pelos operadores +=, -=, *= e /=, então não podem ser chaves de dicionário.
+	__hash__ = None
 	 
 	def __add__(self, other):
 		'''Implementa a soma de dois quaternions e a de um quaternion com um número à direita.'''
-		if type(other) == Quaternion:
-			return self._a1 + other._a1, self._a2 + other._a2, self._a3 + other._a3, self._a4 + other._a4
-		if type(other) == int or type(other) == float:
-			return self._a1 + other, self._a2, self._a3, self._a4
-		if type(other) == complex:
-			return self._a1 + other.real, self._a2 + other.imag, self._a3, self._a4
+		if type(other) is Quaternion:
+			return Quaternion(self._a1 + other._a1, self._a2 + other._a2, self._a3 + other._a3, self._a4 + other._a4)
+		if type(other) is int or type(other) is float:
+			return Quaternion(self._a1 + other, self._a2, self._a3, self._a4)
+		if type(other) is complex:
+			return Quaternion(self._a1 + other.real, self._a2 + other.imag, self._a3, self._a4)
+		return NotImplemented
 	
 	def __radd__(self, other):
 		'''Implementa a soma de um quaternion com um número à esquerda.'''
-		if type(other) == int or type(other) == float:
-			return self._a1 + other, self._a2, self._a3, self._a4
-		if type(other) == complex:
-			return self._a1 + other.real, self._a2 + other.imag, self._a3, self._a4
+		return self.__add__(other)
 			
 	def __iadd__(self, other):
-		'''Implementa a soma de dois quaternions e a de um quaternion com um número a partir do operador +=.'''
-		if type(other) == Quaternion:
-			return self._a1 + other._a1, self._a2 + other._a2, self._a3 + other._a3, self._a4 + other._a4
-		if type(other) == int or type(other) == float:
-			return self._a1 + other, self._a2, self._a3, self._a4
-		if type(other) == complex:
-			return self._a1 + other.real, self._a2 + other.imag, self._a3, self._a4
+		'''Implementa a soma de dois quaternions e a de um quaternion com um número a partir do operador +=, alterando o próprio quaternion.'''
+		if type(other) is Quaternion:
+			self._a1 += other._a1
+			self._a2 += other._a2
+			self._a3 += other._a3
+			self._a4 += other._a4
+		elif type(other) is int or type(other) is float:
+			self._a1 += other
+		elif type(other) is complex:
+			self._a1 += other.real
+			self._a2 += other.imag
+		else:
+			return NotImplemented
+		return self
 	
 	def __sub__(self, other):
 		'''Implementa a subtração de dois quaternions e a de um quaternion com um número à direita.'''
-		if type(other) == Quaternion:
-			return self._a1 - other._a1, self._a2 - other._a2, self._a3 - other._a3, self._a4 - other._a4
-		if type(other) == int or type(other) == float:
-			return self._a1 - other, self._a2, self._a3, self._a4
-		if type(other) == complex:
-			return self._a1 - other.real, self._a2 - other.imag, self._a3, self._a4
+		if type(other) is Quaternion:
+			return Quaternion(self._a1 - other._a1, self._a2 - other._a2, self._a3 - other._a3, self._a4 - other._a4)
+		if type(other) is int or type(other) is float:
+			return Quaternion(self._a1 - other, self._a2, self._a3, self._a4)
+		if type(other) is complex:
+			return Quaternion(self._a1 - other.real, self._a2 - other.imag, self._a3, self._a4)
+		return NotImplemented
 		
 	def __rsub__(self, other):
 		'''Implementa a subtração de um quaternion com um número à esquerda.'''
-		if type(other) == int or type(other) == float:
-			return self._a1 - other, -self._a2, -self._a3, -self._a4
-		if type(other) == complex:
-			return self._a1 - other.real, self._a2 - other.imag, -self._a3, -self._a4
+		if type(other) is int or type(other) is float:
+			return Quaternion(other - self._a1, -self._a2, -self._a3, -self._a4)
+		if type(other) is complex:
+			return Quaternion(other.real - self._a1, other.imag - self._a2, -self._a3, -self._a4)
+		return NotImplemented
 			
 	def __isub__(self, other):
-		'''Implementa a subtração de dois quaternions e a de um quaternion com um número a partir do operador -=.'''
-		if type(other) == Quaternion:
-			return self._a1 - other._a1, self._a2 - other._a2, self._a3 - other._a3, self._a4 - other._a4
-		if type(other) == int or type(other) == float:
-			return self._a1 - other, self._a2, self._a3, self._a4
-		if type(other) == complex:
-			return self._a1 - other.real, self._a2 - other.imag, self._a3, self._a4
+		'''Implementa a subtração de dois quaternions e a de um quaternion com um número a partir do operador -=, alterando o próprio quaternion.'''
+		if type(other) is Quaternion:
+			self._a1 -= other._a1
+			self._a2 -= other._a2
+			self._a3 -= other._a3
+			self._a4 -= other._a4
+		elif type(other) is int or type(other) is float:
+			self._a1 -= other
+		elif type(other) is complex:
+			self._a1 -= other.real
+			self._a2 -= other.imag
+		else:
+			return NotImplemented
+		return self
 			
 	def conjugate(self):
 		'''Dado um quaternion, retorna seu conjugado.'''
-		return self._a1, self._a2 - 2*self._a2, self._a3 - 2*self._a3, self._a4 - 2*self._a4
-	
+		return Quaternion(self._a1, -self._a2, -self._a3, -self._a4)
+
 	def __mul__(self, other):
 		'''Implementa a multiplicação de dois quaternions e a de um quaternion com um número à direita.'''
-		if type(other) == Quaternion:
-			return self._a1*other._a1 - self._a2*other._a2 - self._a3*other._a3 - self._a4*other._a4, self._a1*other._a2 + self._a2*other._a1 + self._a3*other._a4 - self._a4*other._a3, self._a1*other._a3 - self._a2*other._a4 + self._a3*other._a1 + self._a4*other._a2, self._a1*other._a4 + self._a2*other._a3 - self._a3*other._a2 + self._a4*other._a1
-		if type(other) == int or type(other) == float:
-			return self._a1*other, self._a2*other, self._a3*other, self._a4*other
-		if type(other) == complex:
-			return self._a1*other.real - self._a2*other.imag, self._a1*other.imag + self._a2*other.real, self._a3*other.real + self._a4*other.imag, -self._a3*other.imag + self._a4*other.real
+		if type(other) is Quaternion:
+			a1, a2, a3, a4 = self._a1, self._a2, self._a3, self._a4
+			b1, b2, b3, b4 = other._a1, other._a2, other._a3, other._a4
+			return Quaternion(a1*b1 - a2*b2 - a3*b3 - a4*b4, a1*b2 + a2*b1 + a3*b4 - a4*b3, a1*b3 - a2*b4 + a3*b1 + a4*b2, a1*b4 + a2*b3 - a3*b2 + a4*b1)
+		if type(other) is int or type(other) is float:
+			return Quaternion(self._a1*other, self._a2*other, self._a3*other, self._a4*other)
+		if type(other) is complex:
+			r, s = other.real, other.imag
+			return Quaternion(self._a1*r - self._a2*s, self._a1*s + self._a2*r, self._a3*r + self._a4*s, -self._a3*s + self._a4*r)
+		return NotImplemented
 	
 	def __rmul__(self, other):
 		'''Implementa a multiplicação de um quaternion com um número à esquerda.'''
-		if type(other) == int or type(other) == float:
-			return self._a1*other, self._a2*other, self._a3*other, self._a4*other
-		if type(other) == complex:
-			return self._a1*other.real - self._a2*other.imag, self._a1*other.imag + self._a2*other.real, self._a3*other.real - self._a4*other.imag, self._a3*other.imag + self._a4*other.real
+		if type(other) is int or type(other) is float:
+			return Quaternion(self._a1*other, self._a2*other, self._a3*other, self._a4*other)
+		if type(other) is complex:
+			r, s = other.real, other.imag
+			return Quaternion(self._a1*r - self._a2*s, self._a1*s + self._a2*r, self._a3*r - self._a4*s, self._a3*s + self._a4*r)
+		return NotImplemented
 		
 	def __imul__(self, other):
-		'''Implementa a multiplicação de dois quaternions e a de um quaternion com um número a partir do operador *=.'''
-		if type(other) == Quaternion:
-			return self._a1*other._a1 - self._a2*other._a2 - self._a3*other._a3 - self._a4*other._a4, self._a1*other._a2 + self._a2*other._a1 + self._a3*other._a4 - self._a4*other._a3, self._a1*other._a3 - self._a2*other._a4 + self._a3*other._a1 + self._a4*other._a2, self._a1*other._a4 + self._a2*other._a3 - self._a3*other._a2 + self._a4*other._a1
-		if type(other) == int or type(other) == float:
-			return self._a1*other, self._a2*other, self._a3*other, self._a4*other
-		if type(other) == complex:
-			return self._a1*other.real - self._a2*other.imag, self._a1*other.imag + self._a2*other.real, self._a3*other.real + self._a4*other.imag, -self._a3*other.imag + self._a4*other.real
+		'''Implementa a multiplicação de dois quaternions e a de um quaternion com um número a partir do operador *=, alterando o próprio quaternion.'''
+		product = self.__mul__(other)
+		if product is NotImplemented:
+			return NotImplemented
+		self._a1, self._a2, self._a3, self._a4 = product._a1, product._a2, product._a3, product._a4
+		return self
     
 	def norm(self):
 		'''Dado um quaternion, retorna sua norma.'''
-		return math.sqrt(self._a1**2 + self._a2**2 + self._a3**2 + self._a4**2)
+		return math.sqrt(self._a1*self._a1 + self._a2*self._a2 + self._a3*self._a3 + self._a4*self._a4)
 		
 	def inverse(self):
-		'''Dado um quaternion, retorna seu inverso.'''
-		return self.conjugate()[0]/(self._a1**2 + self._a2**2 + self._a3**2 + self._a4**2), self.conjugate()[1]/(self._a1**2 + self._a2**2 + self._a3**2 + self._a4**2), self.conjugate()[2]/(self._a1**2 + self._a2**2 + self._a3**2 + self._a4**2), self.conjugate()[3]/(self._a1**2 + self._a2**2 + self._a3**2 + self._a4**2) 
+		'''Dado um quaternion, retorna seu inverso (o conjugado dividido pelo quadrado da norma).'''
+		n = self._a1*self._a1 + self._a2*self._a2 + self._a3*self._a3 + self._a4*self._a4
+		return Quaternion(self._a1/n, -self._a2/n, -self._a3/n, -self._a4/n)
+
+	def _divisor(self, other):
+		'''Retorna o quaternion pelo qual self deve ser multiplicado à direita para ser dividido por other (None para outros tipos).'''
+		if type(other) is Quaternion:
+			return other.inverse()
+		if type(other) is complex:
+			return Quaternion(other.real, other.imag, 0, 0).inverse()
+		return None
 	
 	def __truediv__(self, other):
 		'''Implementa a divisão de dois quaternions e a de um quaternion com um número à direita.'''
-		if type(other) == Quaternion:
-			return self._a1*other.inverse()[0] - self._a2*other.inverse()[1] - self._a3*other.inverse()[2] - self._a4*other.inverse()[3], self._a1*other.inverse()[1] + self._a2*other.inverse()[0] + self._a3*other.inverse()[3] - self._a4*other.inverse()[2], self._a1*other.inverse()[2] - self._a2*other.inverse()[3] + self._a3*other.inverse()[0] + self._a4*other.inverse()[1], self._a1*other.inverse()[3] + self._a2*other.inverse()[2] - self._a3*other.inverse()[1] + self._a4*other.inverse()[0]
-		if type(other) == int or type(other) == float:
-			return self._a1/other, self._a2/other, self._a3/other, self._a4/other 
-		if type(other) == complex:
-			new = Quaternion(other.real, other.imag, 0, 0)
-			return self._a1*new.inverse()[0] - self._a2*new.inverse()[1] - self._a3*new.inverse()[2] - self._a4*new.inverse()[3], self._a1*new.inverse()[1] + self._a2*new.inverse()[0] + self._a3*new.inverse()[3] - self._a4*new.inverse()[2], self._a1*new.inverse()[2] - self._a2*new.inverse()[3] + self._a3*new.inverse()[0] + self._a4*new.inverse()[1], self._a1*new.inverse()[3] + self._a2*new.inverse()[2] - self._a3*new.inverse()[1] + self._a4*new.inverse()[0]
+		if type(other) is int or type(other) is float:
+			return Quaternion(self._a1/other, self._a2/other, self._a3/other, self._a4/other)
+		divisor = self._divisor(other)
+		if divisor is None:
+			return NotImplemented
+		return self.__mul__(divisor)
+
+	def __itruediv__(self, other):
+		'''Implementa a divisão de dois quaternions e a de um quaternion com um número a partir do operador /=, alterando o próprio quaternion.'''
+		if type(other) is int or type(other) is float:
+			self._a1 /= other
+			self._a2 /= other
+			self._a3 /= other
+			self._a4 /= other
+			return self
+		divisor = self._divisor(other)
+		if divisor is None:
+			return NotImplemented
+		return self.__imul__(divisor)
 		
 	def __rtruediv__(self, other):
-		'''Implementa a divisão de um quaternion com um número à esquerda.'''
-		new_truediv = Quaternion(self.__truediv__(other)[0], self.__truediv__(other)[1], self.__truediv__(other)[2], self.__truediv__(other)[3])
-		if type(other) == int or type(other) == float:
-			return new_truediv.inverse()
-		if type(other) == complex:
-			return new_truediv.inverse()
+		'''Implementa a divisão de um quaternion com um número à esquerda (o número multiplicado pelo inverso do quaternion).'''
+		if type(other) is int or type(other) is float or type(other) is complex:
+			return other*self.inverse()
+		return NotImplemented
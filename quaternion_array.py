@@ -0,0 +1,241 @@
+'''Vetores de quaternions armazenados em um array NumPy de formato (N, 4), com as mesmas operações da classe Quaternion aplicadas a todos os elementos de uma vez.'''
+
+import numpy as np
+
+try:
+	from quaternion.quaternion import Quaternion
+except ImportError:
+	#Permite importar o módulo quando quaternion.py está no mesmo diretório.
+	from quaternion import Quaternion
+
+
+def _hamilton(a, b):
+	'''Produto de Hamilton entre arrays de coeficientes de formato (..., 4), com broadcasting.'''
+	a1, a2, a3, a4 = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+	b1, b2, b3, b4 = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+	out = np.empty(np.broadcast_shapes(a.shape, b.shape))
+	out[..., 0] = a1*b1 - a2*b2 - a3*b3 - a4*b4
+	out[..., 1] = a1*b2 + a2*b1 + a3*b4 - a4*b3
+	out[..., 2] = a1*b3 - a2*b4 + a3*b1 + a4*b2
+	out[..., 3] = a1*b4 + a2*b3 - a3*b2 + a4*b1
+	return out
+
+
+def _inverse(a):
+	'''Inverso de cada quaternion de um array de coeficientes de formato (..., 4).'''
+	out = a/np.einsum('...i,...i->...', a, a)[..., None]
+	out[..., 1:] *= -1
+	return out
+
+
+class QuaternionArray:
+	'''Vetor de N quaternions guardado em um array (N, 4) de floats, uma linha (a1, a2, a3, a4) por quaternion.
+	As operações com outro QuaternionArray são feitas elemento a elemento; com um Quaternion ou com um número real ou complexo, o mesmo valor é aplicado a todos os elementos, com a mesma semântica dos operadores de Quaternion.'''
+
+	__slots__ = ('_data',)
+
+	#Impede que um escalar NumPy à esquerda (np.float64(2)*qa, np.complex128(1j)*qa) trate o vetor como array e aplique a operação a cada coeficiente: assim o Python chama __rmul__, __radd__ etc.
+	__array_ufunc__ = None
+
+	def __init__(self, data):
+		'''Inicializa o vetor a partir de qualquer sequência de formato (N, 4) (ou (4,), para um único quaternion).'''
+		data = np.array(data, dtype=float)
+		if data.ndim == 1:
+			data = data.reshape(1, -1)
+		if data.ndim != 2 or data.shape[1] != 4:
+			raise ValueError('QuaternionArray precisa de um array de formato (N, 4).')
+		self._data = data
+
+	@classmethod
+	def from_quaternions(cls, quaternions):
+		'''Cria o vetor a partir de uma sequência de objetos Quaternion.'''
+		return cls([tuple(q) for q in quaternions])
+
+	@classmethod
+	def _wrap(cls, data):
+		'''Cria o vetor usando o array data sem copiá-lo.'''
+		new = cls.__new__(cls)
+		new._data = data
+		return new
+
+	def array(self):
+		'''Retorna o array (N, 4) de coeficientes (sem cópia).'''
+		return self._data
+
+	def __len__(self):
+		'''Número de quaternions do vetor.'''
+		return len(self._data)
+
+	def __getitem__(self, index):
+		'''Um índice inteiro retorna um Quaternion; fatias e máscaras retornam um QuaternionArray.'''
+		if isinstance(index, (int, np.integer)):
+			return Quaternion(*(float(a) for a in self._data[index]))
+		return QuaternionArray._wrap(self._data[index])
+
+	def __iter__(self):
+		'''Percorre os elementos como objetos Quaternion.'''
+		for row in self._data.tolist():
+			yield Quaternion(*row)
+
+	def __repr__(self):
+		'''Representação do vetor como texto.'''
+		return 'QuaternionArray(%r)' % self._data.tolist()
+
+	@staticmethod
+	def _coefficients(other):
+		'''Retorna os coeficientes de other como array ((N, 4) ou (4,)), ou None se o tipo não é suportado. Números reais e complexos são vistos como os quaternions (x, 0, 0, 0) e (x.real, x.imag, 0, 0).'''
+		if type(other) is QuaternionArray:
+			return other._data
+		if type(other) is Quaternion:
+			return np.array(tuple(other), dtype=float)
+		if isinstance(other, (int, float, np.integer, np.floating)) and not isinstance(other, bool):
+			return np.array((other, 0.0, 0.0, 0.0))
+		if isinstance(other, (complex, np.complexfloating)):
+			return np.array((other.real, other.imag, 0.0, 0.0))
+		return None
+
+	def __add__(self, other):
+		'''Soma elemento a elemento, ou de um mesmo valor à direita.'''
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(self._data + b)
+
+	def __radd__(self, other):
+		'''Soma de um valor à esquerda.'''
+		return self.__add__(other)
+
+	def __iadd__(self, other):
+		'''Soma com o operador +=, alterando o próprio vetor.'''
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		self._data += b
+		return self
+
+	def __sub__(self, other):
+		'''Subtração elemento a elemento, ou de um mesmo valor à direita.'''
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(self._data - b)
+
+	def __rsub__(self, other):
+		'''Subtração de um valor à esquerda.'''
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(b - self._data)
+
+	def __isub__(self, other):
+		'''Subtração com o operador -=, alterando o próprio vetor.'''
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		self._data -= b
+		return self
+
+	def __neg__(self):
+		'''Retorna o vetor com todos os coeficientes trocados de sinal.'''
+		return QuaternionArray._wrap(-self._data)
+
+	def conjugate(self):
+		'''Retorna o vetor dos conjugados.'''
+		out = self._data.copy()
+		out[:, 1:] *= -1
+		return QuaternionArray._wrap(out)
+
+	def __mul__(self, other):
+		'''Produto de Hamilton elemento a elemento, ou por um mesmo valor à direita.'''
+		if isinstance(other, (int, float, np.integer, np.floating)) and not isinstance(other, bool):
+			return QuaternionArray._wrap(self._data*other)
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(_hamilton(self._data, b))
+
+	def __rmul__(self, other):
+		'''Produto de Hamilton por um valor à esquerda (a ordem importa para quaternions).'''
+		if isinstance(other, (int, float, np.integer, np.floating)) and not isinstance(other, bool):
+			return QuaternionArray._wrap(other*self._data)
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(_hamilton(b, self._data))
+
+	def __imul__(self, other):
+		'''Produto com o operador *=, alterando o próprio vetor.'''
+		if isinstance(other, (int, float, np.integer, np.floating)) and not isinstance(other, bool):
+			self._data *= other
+			return self
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		self._data[...] = _hamilton(self._data, b)
+		return self
+
+	def norm(self):
+		'''Retorna o array (N,) das normas.'''
+		return np.sqrt(np.einsum('ij,ij->i', self._data, self._data))
+
+	def normalize(self):
+		'''Retorna o vetor dos quaternions divididos por suas normas.'''
+		return QuaternionArray._wrap(self._data/self.norm()[:, None])
+
+	def inverse(self):
+		'''Retorna o vetor dos inversos.'''
+		return QuaternionArray._wrap(_inverse(self._data))
+
+	def __truediv__(self, other):
+		'''Divisão (produto pelo inverso à direita) elemento a elemento, ou por um mesmo valor.'''
+		if isinstance(other, (int, float, np.integer, np.floating)) and not isinstance(other, bool):
+			return QuaternionArray._wrap(self._data/other)
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(_hamilton(self._data, _inverse(b)))
+
+	def __rtruediv__(self, other):
+		'''Divisão de um valor à esquerda (o valor multiplicado pelo inverso de cada elemento).'''
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		return QuaternionArray._wrap(_hamilton(b, _inverse(self._data)))
+
+	def __itruediv__(self, other):
+		'''Divisão com o operador /=, alterando o próprio vetor.'''
+		if isinstance(other, (int, float, np.integer, np.floating)) and not isinstance(other, bool):
+			self._data /= other
+			return self
+		b = self._coefficients(other)
+		if b is None:
+			return NotImplemented
+		self._data[...] = _hamilton(self._data, _inverse(b))
+		return self
+
+
+def confere_escalares(n=5, seed=0):
+	'''Confere, elemento a elemento, as operações de um vetor aleatório de n quaternions com escalares Python e NumPy, à esquerda e à direita, contra as mesmas operações da classe Quaternion. Retorna True se todos os resultados coincidem.'''
+	rng = np.random.default_rng(seed)
+	qa = QuaternionArray(rng.normal(size=(n, 4)))
+	escalares = [2, 2.5, 1j, 0.5 - 2j, np.int64(3), np.float64(2.5), np.complex128(1j), np.complex128(0.5 - 2j)]
+	operacoes = [lambda a, b: a + b, lambda a, b: a - b, lambda a, b: a*b, lambda a, b: a/b]
+	for x in escalares:
+		#A classe Quaternion só aceita números do Python.
+		y = x.item() if isinstance(x, np.generic) else x
+		for operacao in operacoes:
+			for esquerda, direita, referencia in ((x, qa, lambda q: operacao(y, q)), (qa, x, lambda q: operacao(q, y))):
+				resultado = operacao(esquerda, direita)
+				if type(resultado) is not QuaternionArray:
+					return False
+				esperado = [tuple(referencia(q)) for q in qa]
+				if not np.allclose(resultado.array(), esperado):
+					return False
+	return True
+
+if __name__ == '__main__':
+	if confere_escalares():
+		print('As operações de QuaternionArray com escalares coincidem com as de Quaternion.')
+	else:
+		print('As operações de QuaternionArray com escalares DIVERGEM das de Quaternion.')
+		raise SystemExit(1)
@@ -0,0 +1,139 @@
+'''Run independent replications of the jobs/processors simulation in parallel
+and merge their statistics.'''
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import math
+import random
+import statistics
+import sys
+
+from onlinestats import SimulationStatistics
+from Trabalho3_POO import Processor_par, make_job_parameters, simple_simulation
+
+Replication_par = namedtuple('Replication_par', ['p', 'tau', 'sigma', 'T', 'm', 'alpha'])
+Estimate = namedtuple('Estimate', ['mean', 'half_width', 'low', 'high', 'n'])
+
+
+# Random streams
+
+def stream_seed(seed, index):
+    '''Derive the seed of replication index from the base seed. Seeds are
+    hashed, so different replications get unrelated Mersenne Twister states
+    (no two streams start close to each other in the generator period).'''
+    digest = hashlib.sha256(('%r/%d' % (seed, index)).encode()).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def stream(seed, index):
+    '''Return the random generator of replication index.'''
+    return random.Random(stream_seed(seed, index))
+
+
+# Statistics
+
+def t_probability(t, dof):
+    '''Return P(|T| <= t) for a Student t variable with an integer number of
+    degrees of freedom, from the exact finite series in theta =
+    atan(t/sqrt(dof)) (Abramowitz and Stegun 26.7.3 and 26.7.4).'''
+    theta = math.atan(t/math.sqrt(dof))
+    c2 = math.cos(theta)**2
+    if dof % 2 == 1:
+        term, total = 1.0, 1.0 if dof > 1 else 0.0
+        for k in range(3, dof - 1, 2):
+            term *= c2*(k - 1)/k
+            total += term
+        return 2/math.pi*(theta + math.sin(theta)*math.cos(theta)*total)
+    term, total = 1.0, 1.0
+    for k in range(2, dof - 1, 2):
+        term *= c2*(k - 1)/k
+        total += term
+    return math.sin(theta)*total
+
+
+# Above this many degrees of freedom, the Cornish-Fisher expansion is accurate
+# to better than 1e-7 for confidence levels up to 0.999.
+T_EXACT_DOF = 200
+
+
+def t_quantile(confidence, dof):
+    '''Two-sided Student t critical value: P(|T| <= t) = confidence. Exact
+    (bisection on the series of t_probability, to about 1e-12) up to
+    T_EXACT_DOF degrees of freedom; above it, from the Cornish-Fisher
+    expansion around the normal quantile.'''
+    if dof <= 0:
+        return math.inf
+    if dof <= T_EXACT_DOF:
+        low, high = 0.0, math.pi/2
+        for i in range(60):
+            middle = (low + high)/2
+            if t_probability(math.sqrt(dof)*math.tan(middle), dof) < confidence:
+                low = middle
+            else:
+                high = middle
+        return math.sqrt(dof)*math.tan((low + high)/2)
+    z = statistics.NormalDist().inv_cdf((1 + confidence)/2)
+    z3, z5, z7 = z**3, z**5, z**7
+    return (z + (z3 + z)/(4*dof) + (5*z5 + 16*z3 + 3*z)/(96*dof**2)
+            + (3*z7 + 19*z5 + 17*z3 - 15*z)/(384*dof**3))
+
+
+def estimate(values, confidence=0.95):
+    '''Mean and confidence interval of a list of replication values.'''
+    n = len(values)
+    mean = statistics.fmean(values)
+    if n < 2:
+        return Estimate(mean, math.inf, -math.inf, math.inf, n)
+    half_width = t_quantile(confidence, n - 1)*statistics.stdev(values)/math.sqrt(n)
+    return Estimate(mean, half_width, mean - half_width, mean + half_width, n)
+
+
+def merge(replications, confidence=0.95):
+    '''Merge per-replication statistic dicts into a dict of Estimates (only
+    statistics present in every replication are kept).'''
+    keys = [key for key in replications[0] if all(key in r for r in replications)]
+    return {key: estimate([r[key] for r in replications], confidence)
+            for key in keys}
+
+
+# Runner
+
+def run_replication(parameters, seed, index):
+    '''Run one replication with its own random stream and return its
+    statistics.'''
+    rng = stream(seed, index)
+    jobs_p = make_job_parameters(parameters.tau, parameters.sigma, parameters.T,
+                                 parameters.m, parameters.alpha, rng)
+    collector = SimulationStatistics()
+    result = simple_simulation(Processor_par(parameters.p), jobs_p, save=False,
+                               collector=collector)
+    return collector.summary(result.end_time)
+
+
+def run_replications(parameters, replications, seed=0, workers=None,
+                     confidence=0.95):
+    '''Run the given number of replications on a pool of worker processes
+    (all cores by default) and return the merged Estimates together with the
+    list of per-replication statistics, in replication order.'''
+    indices = range(replications)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_replication, [parameters]*replications,
+                                [seed]*replications, indices))
+    return merge(results, confidence), results
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    # Same parameters as Trabalho3_POO, then the number of replications and,
+    # optionally, the number of workers and the base seed.
+    p, tau, sigma, T, m, alpha, n = sys.argv[1:8]
+    parameters = Replication_par(int(p), float(tau), float(sigma), float(T), int(m), int(alpha))
+    workers = int(sys.argv[8]) if len(sys.argv) > 8 else None
+    seed = int(sys.argv[9]) if len(sys.argv) > 9 else 0
+
+    estimates, _ = run_replications(parameters, int(n), seed, workers)
+    for key, est in estimates.items():
+        print('%-20s %.6g +- %.6g' % (key, est.mean, est.half_width))
@@ -0,0 +1,197 @@
+'''Parameter sweeps of the jobs/processors simulation with a result cache.
+
+Every point of the grid is run once per seed (as replication.run_replication
+with that seed). Results are stored in an on-disk cache keyed by a hash of
+the parameters, the seed and the code version (a hash of the sources of the
+modules the results depend on), so a sweep only runs the points that are not
+in the cache yet and any change to the model invalidates old results. Missing
+points run in parallel on a pool of worker processes and are cached as soon
+as each one finishes, so an interrupted sweep loses no finished work. The
+cache can be bounded in size: the least recently used results are evicted
+first.
+
+Usage:
+    python sweep.py --p 1,2,4 --tau 1 --sigma 0.1 --T 1000 --m 1000,10000 --alpha 4
+                    [--seeds 0-9] [--workers N] [--cache DIR] [--max-size MB] [--output FILE]
+'''
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import tempfile
+
+import desimul
+import onlinestats
+import replication
+import Trabalho3_POO
+from replication import Replication_par, merge, run_replication
+
+# Modules whose code determines the results.
+MODEL_MODULES = (desimul, Trabalho3_POO, onlinestats, replication)
+
+
+def code_version():
+    '''Return a hash of the sources of the model modules.'''
+    digest = hashlib.sha256()
+    for module in MODEL_MODULES:
+        with open(module.__file__, 'rb') as infile:
+            digest.update(infile.read())
+    return digest.hexdigest()
+
+
+def run_key(parameters, seed, version):
+    '''Return the cache key of a run.'''
+    text = json.dumps({'parameters': parameters._asdict(), 'seed': seed, 'version': version},
+                      sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    '''Directory of JSON results, one file per key, holding at most
+    max_bytes bytes (no limit if None).'''
+
+    def __init__(self, directory, max_bytes=None):
+        '''Open (or create) the cache in directory.'''
+        self._directory = directory
+        self._max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        '''Return the file of a key (in a subdirectory named by its first two
+        characters, to keep directories small).'''
+        return os.path.join(self._directory, key[:2], key + '.json')
+
+    def get(self, key):
+        '''Return the result stored under key, or None. A hit marks the
+        result as recently used.'''
+        path = self._path(key)
+        try:
+            with open(path) as infile:
+                result = json.load(infile)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        '''Store a result under key. The file is written under a temporary
+        name and renamed, so readers never see a partial result.'''
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(handle, 'w') as outfile:
+            json.dump(result, outfile)
+        os.replace(temporary, path)
+
+    def entries(self):
+        '''Return a list of (last use, size, path) of the stored results.'''
+        entries = []
+        for directory, _, names in os.walk(self._directory):
+            for name in names:
+                if name.endswith('.json'):
+                    path = os.path.join(directory, name)
+                    status = os.stat(path)
+                    entries.append((status.st_mtime, status.st_size, path))
+        return entries
+
+    def evict(self):
+        '''Remove the least recently used results until the cache fits in
+        max_bytes. Return the number of removed results.'''
+        if self._max_bytes is None:
+            return 0
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def expand_grid(**values):
+    '''Return the Replication_par of every combination of the lists of
+    values given for each parameter.'''
+    names = Replication_par._fields
+    return [Replication_par(*combination) for combination in itertools.product(*[values[name] for name in names])]
+
+
+def sweep(grid, seeds, cache, workers=None):
+    '''Run every point of grid (a list of Replication_par) for every seed,
+    skipping the runs found in cache. Return the list of (parameters, seed,
+    statistics) in grid and seed order and the number of cache hits.'''
+    version = code_version()
+    runs = [(parameters, seed, run_key(parameters, seed, version)) for parameters in grid for seed in seeds]
+    results = {}
+    for parameters, seed, key in runs:
+        result = cache.get(key)
+        if result is not None:
+            results[key] = result
+    hits = len(results)
+
+    missing = {key: (parameters, seed) for parameters, seed, key in runs if key not in results}
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_replication, parameters, seed, 0): key
+                       for key, (parameters, seed) in missing.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                results[key] = future.result()
+                cache.put(key, results[key])
+    cache.evict()
+    return [(parameters, seed, results[key]) for parameters, seed, key in runs], hits
+
+
+def parse_list(text, kind):
+    '''Parse a comma separated list of values; for integers, "a-b" stands
+    for a, a + 1, ..., b.'''
+    values = []
+    for item in text.split(','):
+        match = re.fullmatch(r'(-?\d+)-(-?\d+)', item) if kind is int else None
+        if match:
+            values.extend(range(int(match.group(1)), int(match.group(2)) + 1))
+        else:
+            values.append(kind(item))
+    return values
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Sweep the simulation over a parameter grid.')
+    for name, kind in zip(Replication_par._fields, (int, float, float, float, int, int)):
+        parser.add_argument('--' + name, required=True, type=lambda text, kind=kind: parse_list(text, kind),
+                            help='comma separated values of %s' % name)
+    parser.add_argument('--seeds', type=lambda text: parse_list(text, int), default=[0],
+                        help='seeds, e.g. 0-9 or 1,5,7 (default 0)')
+    parser.add_argument('--workers', type=int, help='number of worker processes (default: all cores)')
+    parser.add_argument('--cache', default='.sweep-cache', help='cache directory (default .sweep-cache)')
+    parser.add_argument('--max-size', type=float, metavar='MB', help='largest size of the cache')
+    parser.add_argument('--output', metavar='FILE', help='write the statistics of every run as JSON lines')
+    options = parser.parse_args()
+
+    grid = expand_grid(**{name: getattr(options, name) for name in Replication_par._fields})
+    max_bytes = None if options.max_size is None else int(options.max_size*2**20)
+    runs, hits = sweep(grid, options.seeds, ResultCache(options.cache, max_bytes), options.workers)
+    print('%d runs, %d from the cache' % (len(runs), hits))
+
+    if options.output:
+        with open(options.output, 'w') as outfile:
+            for parameters, seed, statistics in runs:
+                print(json.dumps({'parameters': parameters._asdict(), 'seed': seed, 'statistics': statistics}),
+                      file=outfile)
+
+    # Estimates over the seeds of each grid point.
+    for i, parameters in enumerate(grid):
+        statistics = [run[2] for run in runs[i*len(options.seeds):(i + 1)*len(options.seeds)]]
+        estimates = merge(statistics)
+        print(' '.join('%s=%s' % item for item in parameters._asdict().items()),
+              'mean_wait=%.6g+-%.6g' % (estimates['mean_wait'].mean, estimates['mean_wait'].half_width),
+              'utilization=%.4g' % estimates['utilization'].mean)
@@ -0,0 +1,215 @@
+'''Workload generators for the jobs/processors simulation of Trabalho3_POO.
+
+The generators sample the job parameters in chunks with NumPy and yield them
+one at a time, so building the inputs costs a few vectorized calls per chunk
+instead of one Python call per job, and memory stays bounded by the chunk size
+however many jobs there are. Available distributions:
+
+    processing times  'normal' (truncated at zero), 'exponential', 'lognormal'
+    arrival times     'uniform' (n arrivals in [0, T), in order), 'poisson'
+
+Recorded traces can also be replayed: a trace is a set of .npy columns
+(arrival, priority, processing_time) in the format of the columnar module, so
+the binary output of a simulation is itself a trace. Traces are mapped in
+memory and read without NumPy.
+
+Every function returns a Job_par, so the result plugs straight into
+simple_simulation and fast_simulation.
+'''
+
+from array import array
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is only needed to sample the distributions (not to replay traces).
+    np = None
+
+from columnar import JOB_COLUMNS, read_npy, write_npy
+from Trabalho3_POO import Job_par
+
+CHUNK = 65536
+
+# Columns a trace must have, a subset of the job columns of columnar.
+TRACE_COLUMNS = tuple(column for column in JOB_COLUMNS if column[0] != 'start')
+
+
+def _generators(seed, n):
+    '''Return n independent NumPy generators derived from seed (an integer,
+    None or a numpy.random.SeedSequence).'''
+    if np is None:
+        raise ImportError('Sampling the workload distributions needs NumPy.')
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(n)]
+
+
+def _chunks(sample, n, chunk):
+    '''Yield the values of sample(size) for chunks of at most chunk values,
+    n values in total, one at a time.'''
+    for start in range(0, n, chunk):
+        yield from sample(min(chunk, n - start)).tolist()
+
+
+# Processing times
+
+def normal_times(n, tau, sigma, rng, chunk=CHUNK):
+    '''Yield n normal processing times (mean tau, standard deviation sigma)
+    truncated at zero: negative samples are drawn again.'''
+    if tau <= 0:
+        raise ValueError('The mean processing time must be positive.')
+
+    def sample(size):
+        times = rng.normal(tau, sigma, size)
+        negative = np.flatnonzero(times < 0)
+        while len(negative):
+            times[negative] = rng.normal(tau, sigma, len(negative))
+            negative = negative[times[negative] < 0]
+        return times
+    return _chunks(sample, n, chunk)
+
+
+def exponential_times(n, tau, rng, chunk=CHUNK):
+    '''Yield n exponential processing times with mean tau.'''
+    return _chunks(lambda size: rng.exponential(tau, size), n, chunk)
+
+
+def lognormal_times(n, tau, sigma, rng, chunk=CHUNK):
+    '''Yield n lognormal processing times with mean tau and standard
+    deviation sigma (of the times, not of their logarithm).'''
+    if tau <= 0:
+        raise ValueError('The mean processing time must be positive.')
+    s2 = np.log1p((sigma/tau)**2)
+    mu = np.log(tau) - s2/2
+    return _chunks(lambda size: rng.lognormal(mu, np.sqrt(s2), size), n, chunk)
+
+
+# Arrival times
+
+def uniform_arrivals(n, T, rng, chunk=CHUNK):
+    '''Yield n uniform arrival times in [0, T) in increasing order, without
+    sorting. The order statistics of n uniforms are the partial sums of n + 1
+    exponential spacings divided by their total, so the spacings are drawn
+    twice from the same generator state: once for the total, once to yield.
+    rng must not be used by anything else while the arrivals are consumed.'''
+    state = rng.bit_generator.state
+    total = 0.0
+    for start in range(0, n + 1, chunk):
+        total += rng.standard_exponential(min(chunk, n + 1 - start)).sum()
+    rng.bit_generator.state = state
+
+    time = 0.0
+    for start in range(0, n, chunk):
+        times = np.cumsum(rng.standard_exponential(min(chunk, n - start)))
+        times += time
+        time = times[-1]
+        times *= T/total
+        yield from times.tolist()
+
+
+def poisson_arrivals(n, rate, rng, start=0.0, chunk=CHUNK):
+    '''Yield the first n Poisson arrival times (exponential inter-arrival
+    times with the given rate) after start.'''
+    time = start
+    for first in range(0, n, chunk):
+        times = np.cumsum(rng.exponential(1/rate, min(chunk, n - first)))
+        times += time
+        time = times[-1]
+        yield from times.tolist()
+
+
+# Priorities
+
+def shuffled_priorities(m, k, rng, chunk=CHUNK):
+    '''Yield a random permutation of m zeros and k ones. Each chunk gets a
+    hypergeometric number of the remaining ones and is shuffled, which gives
+    every permutation the same probability.'''
+    while m + k > 0:
+        size = min(chunk, m + k)
+        ones = int(rng.hypergeometric(k, m, size)) if k and m else (size if k else 0)
+        priorities = np.zeros(size, dtype=np.int8)
+        priorities[:ones] = 1
+        rng.shuffle(priorities)
+        k -= ones
+        m -= size - ones
+        yield from priorities.tolist()
+
+
+# Job parameters
+
+TIMES = {'normal': normal_times, 'exponential': exponential_times, 'lognormal': lognormal_times}
+ARRIVALS = ('uniform', 'poisson')
+
+
+def make_job_parameters(tau, sigma, T, m, alpha, seed=None, times='normal', arrivals='uniform',
+                        chunk=CHUNK):
+    '''Parameters of m normal and m//alpha priority jobs, as in
+    Trabalho3_POO.make_job_parameters, with the processing times and
+    arrivals drawn from the given distributions (see TIMES and ARRIVALS).
+    Poisson arrivals have rate n/T, so about n jobs arrive by time T. The
+    processing times, arrivals and priorities are drawn lazily from three
+    independent streams derived from seed (see _generators).'''
+    if times not in TIMES:
+        raise ValueError('Unknown processing time distribution %r.' % times)
+    if arrivals not in ARRIVALS:
+        raise ValueError('Unknown arrival process %r.' % arrivals)
+    times_rng, arrivals_rng, priorities_rng = _generators(seed, 3)
+    n = m + m//alpha
+    if times == 'exponential':
+        job_times = exponential_times(n, tau, times_rng, chunk)
+    else:
+        job_times = TIMES[times](n, tau, sigma, times_rng, chunk)
+    if arrivals == 'uniform':
+        job_arrivals = uniform_arrivals(n, T, arrivals_rng, chunk)
+    else:
+        job_arrivals = poisson_arrivals(n, n/T, arrivals_rng, chunk=chunk)
+    return Job_par(n, job_times, job_arrivals, shuffled_priorities(m, m//alpha, priorities_rng, chunk))
+
+
+# Traces
+
+def write_trace(prefix, arrivals, priorities, times):
+    '''Write a recorded trace (sequences of arrival times, priorities and
+    processing times, in order of arrival) as prefix.<column>.npy files.'''
+    arrivals = array('d', arrivals)
+    if any(a > b for a, b in zip(arrivals, arrivals[1:])):
+        raise ValueError('Trace arrival times must be in increasing order.')
+    columns = (arrivals, priorities, times)
+    if len({len(column) for column in columns}) != 1:
+        raise ValueError('Trace columns must have the same length.')
+    for (name, descr), values in zip(TRACE_COLUMNS, columns):
+        write_npy('%s.%s.npy' % (prefix, name), values, descr)
+
+
+def read_trace(prefix):
+    '''Return the Job_par that replays the trace of prefix, mapped in memory
+    (the jobs of a simulation saved in binary with prefix 'jobs' are a
+    trace).'''
+    arrival, priority, processing_time = (read_npy('%s.%s.npy' % (prefix, name))
+                                          for name, descr in TRACE_COLUMNS)
+    if not len(arrival) == len(priority) == len(processing_time):
+        raise ValueError('Trace %s has columns of different lengths.' % prefix)
+    return Job_par(len(arrival), iter(processing_time), iter(arrival), iter(priority))
+
+
+def convert_trace(filename, prefix):
+    '''Convert a text trace (lines "arrival priority processing_time", as the
+    first columns of jobs.dat) to a binary trace.'''
+    arrivals, priorities, times = array('d'), array('i'), array('d')
+    with open(filename) as infile:
+        for line in infile:
+            fields = line.split()
+            if fields:
+                arrivals.append(float(fields[0]))
+                priorities.append(int(fields[1]))
+                times.append(float(fields[2]))
+    write_trace(prefix, arrivals, priorities, times)
+
+
+# Code to run
+
+if __name__ == '__main__':
+
+    # python workload.py TEXT_TRACE PREFIX converts a text trace to binary.
+    convert_trace(sys.argv[1], sys.argv[2])